@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""Structured access logs written off the request path.
+
+Request handlers only append a tuple to an in-memory buffer. A
+background thread wakes up every flush interval, or sooner once a batch
+has built up, serializes the buffered records as JSON lines and writes
+them with one call to stdout or to a size-rotated file. The buffer is
+bounded: when the writer cannot keep up, new records are dropped and
+counted instead of slowing requests down.
+
+Every request gets an ID: the caller's X-Request-ID when it sends a
+usable one, otherwise a per-process random prefix plus a counter. It is
+logged and echoed back in the X-Request-ID response header. Probe
+requests are answered before the application and are not logged.
+"""
+
+import atexit
+import itertools
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from flask import g, request
+
+import jsonprovider
+import metrics
+from workerthread import WorkerThread
+
+# Wake the writer early once this many records are waiting
+BATCH_SIZE = 512
+
+def default_destination():
+    """stdout in the production modes; Werkzeug already logs in dev mode"""
+    return 'off' if os.getenv('SERVER_MODE', 'dev') == 'dev' else '-'
+
+ACCESS_LOG = os.getenv('ACCESS_LOG', default_destination())
+ACCESS_LOG_BUFFER = int(os.getenv('ACCESS_LOG_BUFFER', 10000))
+ACCESS_LOG_FLUSH_INTERVAL = float(os.getenv('ACCESS_LOG_FLUSH_INTERVAL', 0.5))
+ACCESS_LOG_MAX_BYTES = int(os.getenv('ACCESS_LOG_MAX_BYTES', 100 * 1024 * 1024))
+ACCESS_LOG_BACKUPS = int(os.getenv('ACCESS_LOG_BACKUPS', 5))
+
+# Incoming request IDs are logged verbatim, so only accept tame ones
+REQUEST_ID_PATTERN = re.compile(r'[A-Za-z0-9._:-]{1,128}')
+
+FIELDS = ('time', 'request_id', 'method', 'path', 'route', 'status', 'duration_ms', 'bytes', 'remote_addr')
+
+def per_process_path(path):
+    """The file path with a {pid} placeholder, added before the extension if missing
+
+    In the production modes several processes write at once: the workers,
+    and two generations during a reload. Each rotates on its own byte
+    count, so one shared file would be renamed under the others' feet.
+    """
+    if '{pid}' in path or os.getenv('SERVER_MODE', 'dev') == 'dev':
+        return path
+    stem, ext = os.path.splitext(path)
+    return f'{stem}.{{pid}}{ext}'
+
+class RotatingFile:
+    """Append-only file that is rotated to .1, .2, ... when it grows too big"""
+
+    def __init__(self, path, max_bytes, backups):
+        # Workers of a pre-fork server each need their own file
+        self.path = path.replace('{pid}', str(os.getpid()))
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._open()
+
+    def _open(self):
+        self.file = open(self.path, 'ab')
+        self.size = self.file.tell()
+
+    def rotate(self):
+        self.file.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f'{self.path}.{i}'):
+                os.replace(f'{self.path}.{i}', f'{self.path}.{i + 1}')
+        if self.backups:
+            os.replace(self.path, f'{self.path}.1')
+        else:
+            os.remove(self.path)
+        self._open()
+
+    def write(self, data):
+        if self.max_bytes and self.size and self.size + len(data) > self.max_bytes:
+            self.rotate()
+        self.file.write(data)
+        self.file.flush()
+        self.size += len(data)
+
+class StandardOutput:
+    """Batched writes straight to the stdout file descriptor"""
+
+    def write(self, data):
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+
+def format_record(record):
+    """One access log record as a JSON line"""
+    entry = dict(zip(FIELDS, record))
+    entry['time'] = datetime.fromtimestamp(entry['time'], timezone.utc).isoformat(timespec='milliseconds')
+    entry['duration_ms'] = round(entry['duration_ms'], 3)
+    return jsonprovider.dumps(entry) + b'\n'
+
+class AccessLog(WorkerThread):
+    """Bounded buffer of access records drained by a background writer"""
+
+    thread_name = 'access-log'
+
+    def __init__(self, destination=ACCESS_LOG, capacity=ACCESS_LOG_BUFFER,
+                 flush_interval=ACCESS_LOG_FLUSH_INTERVAL):
+        self.destination = destination
+        self.enabled = destination != 'off'
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.buffer = deque()
+        self.written = 0
+        self.output = None
+        self._new_ids()
+        self._wake = threading.Event()
+        self._flush_lock = threading.Lock()
+        super().__init__()
+        atexit.register(self.flush)
+
+    def _new_ids(self):
+        self._id_prefix = os.urandom(4).hex()
+        self._id_counter = itertools.count(1)
+
+    def _after_fork(self):
+        # A fresh prefix too, so workers never hand out the same ID
+        self._new_ids()
+        self.output = None
+        self.buffer = deque()
+        self._wake = threading.Event()
+        self._flush_lock = threading.Lock()
+
+    def _prepare(self):
+        """Open the destination the writer thread drains into"""
+        if self.destination == '-':
+            self.output = StandardOutput()
+        else:
+            self.output = RotatingFile(per_process_path(self.destination), ACCESS_LOG_MAX_BYTES, ACCESS_LOG_BACKUPS)
+
+    def request_id(self, incoming=''):
+        """The caller's request ID if it is usable, otherwise a new one"""
+        if incoming and REQUEST_ID_PATTERN.fullmatch(incoming):
+            return incoming
+        return f'{self._id_prefix}-{next(self._id_counter):x}'
+
+    def record(self, *record):
+        """Queue one record (fields in FIELDS order) without blocking"""
+        if not self.enabled:
+            return
+        if not self.running:
+            self.start()
+        buffer = self.buffer
+        if len(buffer) >= self.capacity:
+            metrics.access_log_dropped(1)
+            return
+        buffer.append(record)
+        if len(buffer) >= BATCH_SIZE:
+            self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Write out everything buffered so far in one batch"""
+        if self.output is None:
+            return
+        with self._flush_lock:
+            buffer = self.buffer
+            batch = [buffer.popleft() for _ in range(len(buffer))]
+            if not batch:
+                return
+            try:
+                self.output.write(b''.join(format_record(record) for record in batch))
+                self.written += len(batch)
+            except (OSError, ValueError):
+                # Never let a full disk or closed stdout take the writer down
+                metrics.access_log_dropped(len(batch))
+
+    def report(self):
+        """Access log pipeline state; dropped counts every worker"""
+        return {
+            'destination': self.destination,
+            'capacity': self.capacity,
+            'buffered': len(self.buffer),
+            'written': self.written,
+            'dropped': int(metrics.GROUP_ACCESS_LOG_DROPPED.value())
+        }
+
+    def _before_request(self):
+        g.access_log_started = time.perf_counter()
+        g.request_id = self.request_id(request.headers.get('X-Request-ID', ''))
+
+    def _after_request(self, response):
+        request_id = g.get('request_id')
+        if request_id is None:
+            return response
+        response.headers['X-Request-ID'] = request_id
+        self.record(time.time(), request_id, request.method, request.path, metrics.handler_name(),
+                    response.status_code, (time.perf_counter() - g.access_log_started) * 1000,
+                    response.content_length, request.remote_addr)
+        return response
+
+    def init_app(self, app):
+        """Log every request of a Flask app"""
+        # Register before admission control so shed requests are logged too
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+access_log = AccessLog()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Admission control that sheds low-priority requests under load.
+
+Every request that reaches a route handler is counted while it is in
+flight. When the process is saturated, low-priority requests (dashboard
+renders by default) are rejected at once with ``503`` and
+``Retry-After`` instead of queueing behind everything else. Health
+checks and the JSON API are always admitted, so their latency holds.
+
+A request counts as saturated when either limit is crossed:
+
+- in flight: this worker is already handling SHED_MAX_IN_FLIGHT
+  requests
+- queue delay: the request waited longer than SHED_MAX_QUEUE_DELAY
+  between the load balancer and the worker, according to the
+  ``X-Request-Start`` header set by the proxy (``t=`` seconds,
+  milliseconds or microseconds since the epoch)
+"""
+
+import os
+import threading
+import time
+
+from flask import current_app, g, request
+
+import metrics
+from responses import dumps_bytes
+
+def default_max_in_flight():
+    """Leave one thread per threaded worker free for probes and the API"""
+    server_mode = os.getenv('SERVER_MODE', 'dev')
+    if server_mode == 'threaded':
+        return max(int(os.getenv('THREADS', 8)) - 1, 1)
+    if server_mode == 'async':
+        return 256
+    # Synchronous workers handle one request at a time; only queue delay applies
+    return 0
+
+SHED_MAX_IN_FLIGHT = int(os.getenv('SHED_MAX_IN_FLIGHT', default_max_in_flight()))
+SHED_MAX_QUEUE_DELAY = float(os.getenv('SHED_MAX_QUEUE_DELAY', 0.5))
+SHED_RETRY_AFTER = int(os.getenv('SHED_RETRY_AFTER', 1))
+SHED_ENDPOINTS = tuple(name.strip() for name in os.getenv('SHED_ENDPOINTS', 'dashboard').split(',') if name.strip())
+
+SHED_BODY = dumps_bytes({
+    'error': 'Service Unavailable',
+    'message': 'The server is busy, please retry shortly'
+})
+
+def parse_request_start(value):
+    """Epoch seconds from an X-Request-Start header, or None"""
+    value = value.strip().removeprefix('t=')
+    try:
+        started = float(value)
+    except ValueError:
+        return None
+    # Proxies send seconds, milliseconds or microseconds
+    if started > 1e14:
+        return started / 1e6
+    if started > 1e11:
+        return started / 1e3
+    return started
+
+class AdmissionController:
+    """Track in-flight requests and shed low-priority ones past the limits"""
+
+    def __init__(self, max_in_flight=SHED_MAX_IN_FLIGHT, max_queue_delay=SHED_MAX_QUEUE_DELAY,
+                 retry_after=SHED_RETRY_AFTER, low_priority=SHED_ENDPOINTS):
+        self.max_in_flight = max_in_flight
+        self.max_queue_delay = max_queue_delay
+        self.retry_after = retry_after
+        self.low_priority = frozenset(low_priority)
+        self.in_flight = 0
+        self.queue_delay = None
+        self.shed = {'in_flight': 0, 'queue_delay': 0}
+        self._lock = threading.Lock()
+        self.headers = [
+            ('Content-Type', 'application/json'),
+            ('Retry-After', str(retry_after)),
+            ('Cache-Control', 'no-store')
+        ]
+
+    def overload_reason(self, request_start):
+        """Why the process is too busy for low-priority work, or None"""
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            return 'in_flight'
+        if request_start and self.max_queue_delay:
+            started = parse_request_start(request_start)
+            if started is not None:
+                self.queue_delay = max(time.time() - started, 0.0)
+                if self.queue_delay > self.max_queue_delay:
+                    return 'queue_delay'
+        return None
+
+    def admit(self, handler, request_start=''):
+        """Admit a request, or return the reason it was shed"""
+        with self._lock:
+            reason = self.overload_reason(request_start) if handler in self.low_priority else None
+            if reason is None:
+                self.in_flight += 1
+                return None
+            self.shed[reason] += 1
+        metrics.shed(handler, reason)
+        return reason
+
+    def release(self):
+        """Mark an admitted request as finished"""
+        with self._lock:
+            self.in_flight -= 1
+
+    def report(self):
+        """Current load and shed counts for this process"""
+        return {
+            'in_flight': self.in_flight,
+            'max_in_flight': self.max_in_flight or None,
+            'queue_delay': round(self.queue_delay, 4) if self.queue_delay is not None else None,
+            'max_queue_delay': self.max_queue_delay or None,
+            'shed': dict(self.shed)
+        }
+
+    def _before_request(self):
+        if self.admit(metrics.handler_name(), request.headers.get('X-Request-Start', '')):
+            return current_app.response_class(SHED_BODY, status=503, headers=self.headers)
+        g.admission_admitted = True
+
+    def _teardown_request(self, exc):
+        if g.pop('admission_admitted', False):
+            self.release()
+
+    def init_app(self, app):
+        """Apply admission control to every route of a Flask app"""
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+
+admission = AdmissionController()
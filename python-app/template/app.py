@@ -1,16 +1,48 @@
 #!/usr/bin/env python3
 
+# Imported first so the startup clock covers every other import
+from startup import Deferred, startup
+
+import math
 import os
-import platform
-import psutil
+import re
+import sys
 import time
-from datetime import datetime
-from flask import Flask, jsonify, render_template_string, request
+from flask import Flask, jsonify, request
+from markupsafe import escape
+
+import debug
+import metrics
+from accesslog import access_log
+from admission import admission
+from assets import AssetManifest
+from clock import clock
+from compression import PrecompressedPage, choose_encoding
+from history import FORMATS, HistoryQueryError, MetricsHistory, RateTracker, encode_rows
+from jsonprovider import FastJSONProvider
+from probes import Probes
+from responses import JsonBodyCache, dumps, dumps_bytes
+from runtime import runtime
+from sampler import PLATFORM_INFO, psutil, system_sampler
+from stream import EventBroadcaster, format_event
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
+metrics.init_app(app)
+access_log.init_app(app)
+admission.init_app(app)
+debug.init_app(app)
+
+# Liveness and readiness probes are answered before Flask sees the request
+probes = Probes(clock.uptime)
+probes.readiness_checks.append(startup.ready)
+app.wsgi_app = probes.wsgi(app.wsgi_app)
 
-# Store start time for uptime calculation
-start_time = time.time()
+@app.after_request
+def record_first_byte(response):
+    """Report the cold start on this process's first response"""
+    startup.record_first_byte()
+    return response
 
 # Color themes configuration
 THEMES = {
@@ -70,45 +102,40 @@ THEMES = {
     }
 }
 
+def theme_stylesheet(theme):
+    """Stylesheet defining the colour variables of a theme"""
+    return f""":root {{
+    --primary-color: {theme['primary']};
+    --secondary-color: {theme['secondary']};
+    --accent-color: {theme['accent']};
+    --background: {theme['background']};
+    --card-bg: {theme['card_bg']};
+}}
+"""
+
+# Fingerprinted static assets, cached by browsers until their content changes
+assets = AssetManifest(app.static_folder)
+for asset_path in ('css/dashboard.css', 'css/styles.css', 'js/dashboard.js'):
+    assets.add(asset_path)
+THEME_STYLESHEETS = {name: assets.add(f'css/theme-{name}.css', theme_stylesheet(theme))
+                     for name, theme in THEMES.items()}
+assets.init_app(app)
+
 def get_user():
     """Get user from environment variable"""
     return os.getenv('USER', os.getenv('USERNAME', 'World'))
 
 def get_time_info():
     """Get current date and time information"""
-    now = datetime.now()
-    return {
-        'timestamp': now.strftime('%Y-%m-%d %H:%M:%S'),
-        'date': now.strftime('%Y-%m-%d'),
-        'time': now.strftime('%H:%M:%S'),
-        'day': now.strftime('%A')
-    }
+    return clock.time_info()
+
+def get_uptime():
+    """Seconds since the application started"""
+    return clock.uptime()
 
 def get_system_info():
-    """Get system information"""
-    try:
-        memory = psutil.virtual_memory()
-        return {
-            'python_version': platform.python_version(),
-            'platform': platform.system(),
-            'architecture': platform.machine(),
-            'memory_usage': {
-                'total': memory.total,
-                'available': memory.available,
-                'percent': memory.percent
-            }
-        }
-    except:
-        return {
-            'python_version': platform.python_version(),
-            'platform': platform.system(),
-            'architecture': platform.machine(),
-            'memory_usage': {
-                'total': 'N/A',
-                'available': 'N/A',
-                'percent': 'N/A'
-            }
-        }
+    """Get system information from the background sampler"""
+    return system_sampler.get()
 
 # Enhanced colorful dashboard template
 COLORFUL_TEMPLATE = """
@@ -120,568 +147,9 @@ COLORFUL_TEMPLATE = """
     <title>{{ app_name }} - Modern Python Dashboard</title>
     <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&display=swap" rel="stylesheet">
     <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
-    <style>
-        :root {
-            --primary-color: {{ theme.primary }};
-            --secondary-color: {{ theme.secondary }};
-            --accent-color: {{ theme.accent }};
-            --background: {{ theme.background }};
-            --card-bg: {{ theme.card_bg }};
-        }
-        
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-        
-        body {
-            font-family: 'Inter', sans-serif;
-            background: var(--background);
-            background-attachment: fixed;
-            color: #ffffff;
-            line-height: 1.6;
-            overflow-x: hidden;
-        }
-        
-        .container {
-            max-width: 1400px;
-            margin: 0 auto;
-            padding: 0 20px;
-        }
-        
-        /* Header */
-        .header {
-            background: rgba(255, 255, 255, 0.1);
-            backdrop-filter: blur(20px);
-            border-bottom: 1px solid rgba(255, 255, 255, 0.2);
-            padding: 20px 0;
-            position: sticky;
-            top: 0;
-            z-index: 1000;
-        }
-        
-        .header-content {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-        }
-        
-        .logo {
-            display: flex;
-            align-items: center;
-            gap: 15px;
-            font-size: 28px;
-            font-weight: 800;
-            color: #ffffff;
-        }
-        
-        .logo-icon {
-            width: 50px;
-            height: 50px;
-            background: rgba(255, 255, 255, 0.2);
-            border-radius: 15px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            font-size: 24px;
-            animation: float 3s ease-in-out infinite;
-        }
-        
-        @keyframes float {
-            0%, 100% { transform: translateY(0px); }
-            50% { transform: translateY(-5px); }
-        }
-        
-        .theme-selector {
-            display: flex;
-            gap: 10px;
-            align-items: center;
-        }
-        
-        .theme-btn {
-            width: 40px;
-            height: 40px;
-            border-radius: 50%;
-            border: 3px solid rgba(255, 255, 255, 0.3);
-            cursor: pointer;
-            transition: all 0.3s ease;
-            position: relative;
-            overflow: hidden;
-        }
-        
-        .theme-btn:hover {
-            transform: scale(1.1);
-            border-color: rgba(255, 255, 255, 0.8);
-        }
-        
-        .theme-btn.active {
-            border-color: #ffffff;
-            box-shadow: 0 0 20px rgba(255, 255, 255, 0.5);
-        }
-        
-        /* Hero Section */
-        .hero {
-            padding: 80px 0;
-            text-align: center;
-            position: relative;
-            overflow: hidden;
-        }
-        
-        .hero::before {
-            content: '';
-            position: absolute;
-            top: 0;
-            left: 0;
-            right: 0;
-            bottom: 0;
-            background: url('data:image/svg+xml,<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 100 100"><defs><pattern id="dots" width="20" height="20" patternUnits="userSpaceOnUse"><circle cx="10" cy="10" r="1" fill="rgba(255,255,255,0.1)"/></pattern></defs><rect width="100%" height="100%" fill="url(%23dots)"/></svg>');
-            animation: move 20s linear infinite;
-        }
-        
-        @keyframes move {
-            0% { transform: translateX(0) translateY(0); }
-            100% { transform: translateX(-20px) translateY(-20px); }
-        }
-        
-        .hero-content {
-            position: relative;
-            z-index: 2;
-        }
-        
-        .hero-title {
-            font-size: 4rem;
-            font-weight: 800;
-            margin-bottom: 20px;
-            background: linear-gradient(45deg, #ffffff, rgba(255,255,255,0.8));
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-            background-clip: text;
-            animation: glow 2s ease-in-out infinite alternate;
-        }
-        
-        @keyframes glow {
-            from { text-shadow: 0 0 10px rgba(255,255,255,0.5); }
-            to { text-shadow: 0 0 20px rgba(255,255,255,0.8); }
-        }
-        
-        .hero-subtitle {
-            font-size: 1.5rem;
-            margin-bottom: 30px;
-            opacity: 0.9;
-        }
-        
-        .status-badge {
-            display: inline-flex;
-            align-items: center;
-            gap: 10px;
-            background: rgba(255, 255, 255, 0.2);
-            padding: 15px 30px;
-            border-radius: 50px;
-            backdrop-filter: blur(10px);
-            border: 1px solid rgba(255, 255, 255, 0.3);
-            margin-bottom: 40px;
-            animation: pulse 2s infinite;
-        }
-        
-        @keyframes pulse {
-            0% { box-shadow: 0 0 0 0 rgba(255, 255, 255, 0.4); }
-            70% { box-shadow: 0 0 0 10px rgba(255, 255, 255, 0); }
-            100% { box-shadow: 0 0 0 0 rgba(255, 255, 255, 0); }
-        }
-        
-        .status-dot {
-            width: 12px;
-            height: 12px;
-            background: #00ff88;
-            border-radius: 50%;
-            animation: blink 1.5s infinite;
-        }
-        
-        @keyframes blink {
-            0%, 50% { opacity: 1; }
-            51%, 100% { opacity: 0.3; }
-        }
-        
-        /* Dashboard Grid */
-        .dashboard {
-            padding: 60px 0;
-        }
-        
-        .dashboard-grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(350px, 1fr));
-            gap: 30px;
-            margin-bottom: 60px;
-        }
-        
-        .dashboard-card {
-            background: rgba(255, 255, 255, 0.1);
-            backdrop-filter: blur(20px);
-            border: 1px solid rgba(255, 255, 255, 0.2);
-            border-radius: 25px;
-            padding: 35px;
-            transition: all 0.4s ease;
-            position: relative;
-            overflow: hidden;
-        }
-        
-        .dashboard-card::before {
-            content: '';
-            position: absolute;
-            top: 0;
-            left: 0;
-            right: 0;
-            bottom: 0;
-            background: var(--card-bg);
-            opacity: 0;
-            transition: opacity 0.3s ease;
-        }
-        
-        .dashboard-card:hover {
-            transform: translateY(-10px) scale(1.02);
-            box-shadow: 0 25px 50px rgba(0, 0, 0, 0.3);
-            border-color: rgba(255, 255, 255, 0.4);
-        }
-        
-        .dashboard-card:hover::before {
-            opacity: 1;
-        }
-        
-        .card-header {
-            display: flex;
-            align-items: center;
-            margin-bottom: 25px;
-            position: relative;
-            z-index: 1;
-        }
-        
-        .card-icon {
-            width: 60px;
-            height: 60px;
-            background: rgba(255, 255, 255, 0.2);
-            border-radius: 20px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            font-size: 24px;
-            margin-right: 20px;
-            animation: rotate 4s linear infinite;
-        }
-        
-        @keyframes rotate {
-            from { transform: rotate(0deg); }
-            to { transform: rotate(360deg); }
-        }
-        
-        .card-title {
-            font-size: 22px;
-            font-weight: 700;
-            color: #ffffff;
-        }
-        
-        .card-content {
-            position: relative;
-            z-index: 1;
-        }
-        
-        .metric {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            padding: 15px 0;
-            border-bottom: 1px solid rgba(255, 255, 255, 0.1);
-            transition: all 0.3s ease;
-        }
-        
-        .metric:hover {
-            padding-left: 10px;
-            background: rgba(255, 255, 255, 0.05);
-            border-radius: 10px;
-        }
-        
-        .metric:last-child {
-            border-bottom: none;
-        }
-        
-        .metric-label {
-            font-size: 16px;
-            color: rgba(255, 255, 255, 0.8);
-            font-weight: 500;
-        }
-        
-        .metric-value {
-            font-size: 18px;
-            font-weight: 700;
-            color: #ffffff;
-            background: rgba(255, 255, 255, 0.1);
-            padding: 5px 15px;
-            border-radius: 15px;
-        }
-        
-        /* API Section */
-        .api-showcase {
-            background: rgba(255, 255, 255, 0.1);
-            backdrop-filter: blur(20px);
-            border: 1px solid rgba(255, 255, 255, 0.2);
-            border-radius: 30px;
-            padding: 50px;
-            margin-bottom: 60px;
-            position: relative;
-            overflow: hidden;
-        }
-        
-        .api-showcase::before {
-            content: '';
-            position: absolute;
-            top: -50%;
-            left: -50%;
-            width: 200%;
-            height: 200%;
-            background: conic-gradient(from 0deg, var(--accent-color), var(--primary-color), var(--secondary-color), var(--accent-color));
-            animation: spin 10s linear infinite;
-            opacity: 0.1;
-        }
-        
-        @keyframes spin {
-            100% { transform: rotate(360deg); }
-        }
-        
-        .api-title {
-            font-size: 2.5rem;
-            font-weight: 800;
-            text-align: center;
-            margin-bottom: 40px;
-            position: relative;
-            z-index: 1;
-            background: linear-gradient(45deg, #ffffff, var(--accent-color));
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-            background-clip: text;
-        }
-        
-        .api-grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(280px, 1fr));
-            gap: 25px;
-            position: relative;
-            z-index: 1;
-        }
-        
-        .api-card {
-            background: rgba(255, 255, 255, 0.1);
-            border: 1px solid rgba(255, 255, 255, 0.2);
-            border-radius: 20px;
-            padding: 25px;
-            transition: all 0.3s ease;
-            position: relative;
-            overflow: hidden;
-        }
-        
-        .api-card::before {
-            content: '';
-            position: absolute;
-            top: 0;
-            left: 0;
-            width: 100%;
-            height: 4px;
-            background: linear-gradient(90deg, var(--primary-color), var(--accent-color));
-            transform: scaleX(0);
-            transition: transform 0.3s ease;
-        }
-        
-        .api-card:hover {
-            transform: translateY(-5px);
-            box-shadow: 0 15px 30px rgba(0, 0, 0, 0.2);
-        }
-        
-        .api-card:hover::before {
-            transform: scaleX(1);
-        }
-        
-        .api-method {
-            display: inline-block;
-            background: var(--accent-color);
-            color: #ffffff;
-            padding: 8px 16px;
-            border-radius: 12px;
-            font-size: 12px;
-            font-weight: 700;
-            margin-bottom: 15px;
-            text-transform: uppercase;
-            letter-spacing: 1px;
-        }
-        
-        .api-path {
-            font-family: 'Courier New', monospace;
-            font-size: 18px;
-            font-weight: 700;
-            color: #ffffff;
-            margin-bottom: 10px;
-            background: rgba(0, 0, 0, 0.2);
-            padding: 10px 15px;
-            border-radius: 10px;
-        }
-        
-        .api-description {
-            color: rgba(255, 255, 255, 0.8);
-            line-height: 1.6;
-        }
-        
-        /* Gallery Section */
-        .gallery-section {
-            padding: 60px 0;
-        }
-        
-        .section-title {
-            font-size: 2.5rem;
-            font-weight: 800;
-            text-align: center;
-            margin-bottom: 50px;
-            background: linear-gradient(45deg, #ffffff, var(--accent-color));
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-            background-clip: text;
-        }
-        
-        .gallery-grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(300px, 1fr));
-            gap: 30px;
-        }
-        
-        .gallery-item {
-            aspect-ratio: 16/9;
-            background: linear-gradient(45deg, var(--primary-color), var(--secondary-color));
-            border-radius: 20px;
-            position: relative;
-            overflow: hidden;
-            cursor: pointer;
-            transition: all 0.3s ease;
-        }
-        
-        .gallery-item:hover {
-            transform: scale(1.05);
-            box-shadow: 0 20px 40px rgba(0, 0, 0, 0.3);
-        }
-        
-        .gallery-item::before {
-            content: '';
-            position: absolute;
-            top: 0;
-            left: 0;
-            right: 0;
-            bottom: 0;
-            background: url('data:image/svg+xml,<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 100 100"><defs><pattern id="waves" width="100" height="100" patternUnits="userSpaceOnUse"><path d="M0 50 Q25 25 50 50 T100 50 V100 H0 Z" fill="rgba(255,255,255,0.1)"/></pattern></defs><rect width="100%" height="100%" fill="url(%23waves)"/></svg>');
-            animation: wave 3s ease-in-out infinite;
-        }
-        
-        @keyframes wave {
-            0%, 100% { transform: translateY(0); }
-            50% { transform: translateY(-10px); }
-        }
-        
-        .gallery-content {
-            position: absolute;
-            bottom: 0;
-            left: 0;
-            right: 0;
-            padding: 25px;
-            background: linear-gradient(transparent, rgba(0, 0, 0, 0.7));
-            color: #ffffff;
-        }
-        
-        .gallery-title {
-            font-size: 20px;
-            font-weight: 700;
-            margin-bottom: 5px;
-        }
-        
-        .gallery-desc {
-            opacity: 0.8;
-        }
-        
-        /* Footer */
-        .footer {
-            background: rgba(0, 0, 0, 0.2);
-            backdrop-filter: blur(20px);
-            border-top: 1px solid rgba(255, 255, 255, 0.2);
-            padding: 40px 0;
-            text-align: center;
-            margin-top: 80px;
-        }
-        
-        .footer-content {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            flex-wrap: wrap;
-            gap: 20px;
-        }
-        
-        .social-links {
-            display: flex;
-            gap: 15px;
-        }
-        
-        .social-link {
-            width: 50px;
-            height: 50px;
-            background: rgba(255, 255, 255, 0.1);
-            border-radius: 50%;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            color: #ffffff;
-            text-decoration: none;
-            transition: all 0.3s ease;
-            font-size: 20px;
-        }
-        
-        .social-link:hover {
-            background: var(--accent-color);
-            transform: translateY(-5px) scale(1.1);
-        }
-        
-        /* Responsive */
-        @media (max-width: 768px) {
-            .hero-title {
-                font-size: 2.5rem;
-            }
-            
-            .dashboard-grid {
-                grid-template-columns: 1fr;
-            }
-            
-            .footer-content {
-                flex-direction: column;
-                text-align: center;
-            }
-            
-            .theme-selector {
-                flex-wrap: wrap;
-            }
-        }
-        
-        /* Animations */
-        .fade-in {
-            animation: fadeIn 1s ease-in;
-        }
-        
-        @keyframes fadeIn {
-            from { opacity: 0; transform: translateY(30px); }
-            to { opacity: 1; transform: translateY(0); }
-        }
-        
-        .slide-in {
-            animation: slideIn 0.8s ease-out;
-        }
-        
-        @keyframes slideIn {
-            from { transform: translateX(-100px); opacity: 0; }
-            to { transform: translateX(0); opacity: 1; }
-        }
-    </style>
+    <link rel="stylesheet" id="theme-stylesheet" href="{{ theme_stylesheets[current_theme] }}">
+    <link rel="stylesheet" href="{{ assets.url('css/dashboard.css') }}">
+    <link rel="stylesheet" href="{{ assets.url('css/styles.css') }}">
 </head>
 <body>
     <!-- Header -->
@@ -696,31 +164,43 @@ COLORFUL_TEMPLATE = """
                     <div class="theme-btn active" 
                          style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%)"
                          onclick="changeTheme('aurora')"
+                         data-theme="aurora"
+                         data-stylesheet="{{ theme_stylesheets.aurora }}"
                          title="Aurora Theme">
                     </div>
                     <div class="theme-btn" 
                          style="background: linear-gradient(135deg, #ff7e5f 0%, #feb47b 100%)"
                          onclick="changeTheme('sunset')"
+                         data-theme="sunset"
+                         data-stylesheet="{{ theme_stylesheets.sunset }}"
                          title="Sunset Theme">
                     </div>
                     <div class="theme-btn" 
                          style="background: linear-gradient(135deg, #1e3c72 0%, #2a5298 100%)"
                          onclick="changeTheme('ocean')"
+                         data-theme="ocean"
+                         data-stylesheet="{{ theme_stylesheets.ocean }}"
                          title="Ocean Theme">
                     </div>
                     <div class="theme-btn" 
                          style="background: linear-gradient(135deg, #134e5e 0%, #71b280 100%)"
                          onclick="changeTheme('forest')"
+                         data-theme="forest"
+                         data-stylesheet="{{ theme_stylesheets.forest }}"
                          title="Forest Theme">
                     </div>
                     <div class="theme-btn" 
                          style="background: linear-gradient(135deg, #8360c3 0%, #2ebf91 100%)"
                          onclick="changeTheme('cosmic')"
+                         data-theme="cosmic"
+                         data-stylesheet="{{ theme_stylesheets.cosmic }}"
                          title="Cosmic Theme">
                     </div>
                     <div class="theme-btn" 
                          style="background: linear-gradient(135deg, #eb3349 0%, #f45c43 100%)"
                          onclick="changeTheme('cherry')"
+                         data-theme="cherry"
+                         data-stylesheet="{{ theme_stylesheets.cherry }}"
                          title="Cherry Theme">
                     </div>
                 </div>
@@ -760,7 +240,7 @@ COLORFUL_TEMPLATE = """
                         </div>
                         <div class="metric">
                             <span class="metric-label">Session Started</span>
-                            <span class="metric-value">{{ time_info.time }}</span>
+                            <span class="metric-value" id="metric-time">{{ time_info.time }}</span>
                         </div>
                         <div class="metric">
                             <span class="metric-label">Today</span>
@@ -802,15 +282,15 @@ COLORFUL_TEMPLATE = """
                     <div class="card-content">
                         <div class="metric">
                             <span class="metric-label">Memory Usage</span>
-                            <span class="metric-value">{{ memory_percent }}%</span>
+                            <span class="metric-value" id="metric-memory">{{ memory_percent }}%</span>
                         </div>
                         <div class="metric">
                             <span class="metric-label">Uptime</span>
-                            <span class="metric-value">{{ uptime }}s</span>
+                            <span class="metric-value" id="metric-uptime">{{ uptime }}s</span>
                         </div>
                         <div class="metric">
                             <span class="metric-label">Theme</span>
-                            <span class="metric-value">{{ theme.name }}</span>
+                            <span class="metric-value" id="theme-name">{{ theme.name }}</span>
                         </div>
                     </div>
                 </div>
@@ -888,95 +368,108 @@ COLORFUL_TEMPLATE = """
         </div>
     </footer>
 
-    <script>
-        function changeTheme(theme) {
-            // Update active theme button
-            document.querySelectorAll('.theme-btn').forEach(btn => {
-                btn.classList.remove('active');
-            });
-            
-            // Update URL and reload with new theme
-            window.location.href = '/?theme=' + theme;
-        }
+    <script src="{{ assets.url('js/dashboard.js') }}" data-stats-source="{{ stats_source }}"></script>
+</body>
+</html>
+"""
+
+# Dashboard render cache.
+# The template is compiled once and rendered once per theme with sentinel
+# markers in place of the per-request values. Each theme's page is stored
+# as a list of static chunks interleaved with field names, so a request
+# only escapes and joins the handful of values that actually change.
+# Compiling and precompressing are deferred according to STARTUP_MODE.
+DASHBOARD_APP_NAME = "${{ values.app_name | title }}"
+_FIELD_MARKER = re.compile(r'\x00(\w+)\x00')
 
-        // Add scroll animations
-        const observerOptions = {
-            threshold: 0.1,
-            rootMargin: '0px 0px -50px 0px'
-        };
+# Only the ASGI app streams live statistics; elsewhere the dashboard polls
+STATS_STREAMING = os.getenv('SERVER_MODE', 'dev') == 'async'
 
-        const observer = new IntersectionObserver(function(entries) {
-            entries.forEach(entry => {
-                if (entry.isIntersecting) {
-                    entry.target.style.opacity = '1';
-                    entry.target.style.transform = 'translateY(0)';
-                }
-            });
-        }, observerOptions);
+dashboard_template = Deferred(lambda: app.jinja_env.from_string(COLORFUL_TEMPLATE))
 
-        // Observe all cards for animations
-        document.querySelectorAll('.dashboard-card, .api-card, .gallery-item').forEach(card => {
-            card.style.opacity = '0';
-            card.style.transform = 'translateY(30px)';
-            card.style.transition = 'opacity 0.6s ease, transform 0.6s ease';
-            observer.observe(card);
-        });
+def _marker(field):
+    """Placeholder rendered in place of a dynamic field"""
+    return f'\x00{field}\x00'
 
-        // Add floating animation to cards
-        document.querySelectorAll('.dashboard-card').forEach((card, index) => {
-            card.style.animationDelay = `${index * 0.2}s`;
-            card.classList.add('fade-in');
-        });
-        
-        // Update theme button states on page load
-        document.addEventListener('DOMContentLoaded', function() {
-            const urlParams = new URLSearchParams(window.location.search);
-            const currentTheme = urlParams.get('theme') || 'aurora';
-            
-            // Remove active class from all buttons
-            document.querySelectorAll('.theme-btn').forEach(btn => {
-                btn.classList.remove('active');
-            });
-            
-            // Add active class to current theme button
-            const themeButtons = document.querySelectorAll('.theme-btn');
-            const themes = ['aurora', 'sunset', 'ocean', 'forest', 'cosmic', 'cherry'];
-            const themeIndex = themes.indexOf(currentTheme);
-            if (themeIndex >= 0 && themeButtons[themeIndex]) {
-                themeButtons[themeIndex].classList.add('active');
-            }
-        });
-    </script>
-</body>
-</html>
-"""
+def build_dashboard_skeleton(theme_name):
+    """Render the static skeleton of the dashboard for a theme"""
+    rendered = dashboard_template.get().render(
+        app_name=DASHBOARD_APP_NAME,
+        user=_marker('user'),
+        time_info={'time': _marker('time'), 'day': _marker('day')},
+        python_version=PLATFORM_INFO['python_version'],
+        platform=PLATFORM_INFO['platform'],
+        memory_percent=_marker('memory_percent'),
+        uptime=_marker('uptime'),
+        theme=THEMES[theme_name],
+        themes=THEMES,
+        current_theme=theme_name,
+        assets=assets,
+        stats_source='stream' if STATS_STREAMING else 'poll',
+        theme_stylesheets=THEME_STYLESHEETS)
+    # re.split with a capture group alternates static text and field names
+    return _FIELD_MARKER.split(rendered)
+
+# Each theme's skeleton with its static chunks precompressed per encoding
+DASHBOARD_PAGES = {name: Deferred(lambda name=name: PrecompressedPage(build_dashboard_skeleton(name)))
+                   for name in THEMES}
+
+def render_dashboard(theme_name, values, encoding='identity'):
+    """Fill the cached skeleton for a theme with per-request values"""
+    escaped = {field: escape(value) for field, value in values.items()}
+    return DASHBOARD_PAGES[theme_name].get().render(escaped, encoding)
+
+def dashboard_page(current_theme, system_info, encoding='identity'):
+    """Dashboard HTML bytes for a theme with the current per-request values"""
+    if current_theme not in THEMES:
+        current_theme = 'aurora'
+    
+    time_info = get_time_info()
+    
+    return render_dashboard(current_theme, {
+        'user': get_user(),
+        'time': time_info['time'],
+        'day': time_info['day'],
+        'memory_percent': system_info['memory_usage'].get('percent', 'N/A'),
+        'uptime': round(get_uptime(), 1)
+    }, encoding)
 
 @app.route('/')
 def dashboard():
     """Beautiful colorful web interface dashboard"""
-    user = get_user()
-    time_info = get_time_info()
-    system_info = get_system_info()
-    
     # Get theme from query parameter
     current_theme = request.args.get('theme', 'aurora')
-    if current_theme not in THEMES:
-        current_theme = 'aurora'
-    
-    theme = THEMES[current_theme]
-    uptime = round(time.time() - start_time, 1)
+    encoding = choose_encoding(request.headers.get('Accept-Encoding', ''))
     
-    return render_template_string(COLORFUL_TEMPLATE,
-                                app_name="${{ values.app_name | title }}",
-                                user=user,
-                                time_info=time_info,
-                                python_version=system_info['python_version'],
-                                platform=system_info['platform'],
-                                memory_percent=system_info['memory_usage'].get('percent', 'N/A'),
-                                uptime=uptime,
-                                theme=theme,
-                                themes=THEMES,
-                                current_theme=current_theme)
+    response = app.response_class(dashboard_page(current_theme, get_system_info(), encoding))
+    response.vary.add('Accept-Encoding')
+    if encoding != 'identity':
+        response.content_encoding = encoding
+    return response
+
+def cached_json(body_cache, **values):
+    """Build a conditional JSON response from a pre-serialized body"""
+    body, etag = body_cache.render(values)
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+API_ENDPOINTS = [
+    '/ - Beautiful colorful web interface',
+    '/api/details - Get application details',
+    '/health - Health check',
+    '/api/stats - Get system statistics',
+    '/api/stats/stream - Live system statistics (Server-Sent Events, SERVER_MODE=async only)',
+    '/api/stats/history - Sampled statistics history'
+]
+
+TIME_FIELDS = ('timestamp', 'date', 'time', 'day')
+
+DETAILS_BODY = JsonBodyCache({
+    'app': "${{ values.app_name | title }} Application",
+    'status': 'running',
+    'version': '1.0.0'
+}, dynamic_fields=('message',) + TIME_FIELDS)
 
 @app.route('/api/details', methods=['GET'])
 def get_details():
@@ -984,84 +477,182 @@ def get_details():
     user = get_user()
     time_info = get_time_info()
     
-    return jsonify({
-        'message': f"Hello {user}",
-        'timestamp': time_info['timestamp'],
-        'date': time_info['date'],
-        'time': time_info['time'],
-        'day': time_info['day'],
+    return cached_json(DETAILS_BODY, message=f"Hello {user}", **time_info)
+
+def container_summary(container):
+    """Memory and CPU throttling headline numbers for the container"""
+    if not container:
+        return None
+    return {
+        'memory_percent': container['memory']['percent'],
+        'memory_limit': container['memory']['limit'],
+        'cpu_quota_cores': container['cpu']['quota_cores'],
+        'cpu_throttled_periods': container['cpu']['throttled_periods']
+    }
+
+def health_payload(system_info):
+    """Health check data"""
+    return {
+        'status': 'healthy',
         'app': "${{ values.app_name | title }} Application",
-        'status': 'running',
-        'version': '1.0.0'
-    })
+        'uptime': round(get_uptime(), 2),
+        'python_version': PLATFORM_INFO['python_version'],
+        'container': container_summary(system_info['container'])
+    }
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint with uptime monitoring"""
-    uptime = time.time() - start_time
-    system_info = get_system_info()
-    
-    return jsonify({
-        'status': 'healthy',
-        'app': "${{ values.app_name | title }} Application",
-        'uptime': round(uptime, 2),
-        'python_version': system_info['python_version']
-    })
+    return jsonify(health_payload(get_system_info()))
 
-@app.route('/api/stats', methods=['GET'])
-def get_stats():
-    """System statistics including Python version and performance metrics"""
-    system_info = get_system_info()
-    
-    return jsonify({
+def stats_payload(system_info):
+    """System statistics data"""
+    return {
         'app': "${{ values.app_name | title }} Application",
         'python_version': system_info['python_version'],
         'platform': system_info['platform'],
         'architecture': system_info['architecture'],
         'memory_usage': system_info['memory_usage'],
-        'timestamp': datetime.now().isoformat()
+        'container': system_info['container'],
+        'uptime': round(get_uptime(), 2),
+        'requests': metrics.group_summary(),
+        'admission': admission.report(),
+        'access_log': access_log.report(),
+        'runtime': runtime.summary(),
+        'startup': startup.report(),
+        'timestamp': clock.isoformat()
+    }
+
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    """System statistics including Python version and performance metrics"""
+    return jsonify(stats_payload(get_system_info()))
+
+# Bounded history of sampled metrics, appended on every system sample
+history = MetricsHistory(int(os.getenv('HISTORY_CAPACITY', 3600)),
+                         ('memory_percent', 'cpu_percent', 'request_rate'))
+request_rate = RateTracker(metrics.requests_served)
+
+def record_history(system_info):
+    """Sampler listener: append the latest sample to the history"""
+    now = time.time()
+    history.append(now, {
+        'memory_percent': system_info['memory_usage']['percent'],
+        'cpu_percent': psutil.cpu_percent(interval=None),
+        'request_rate': request_rate.rate(now)
     })
 
+system_sampler.listeners.append(record_history)
+system_sampler.listeners.append(runtime.publish)
+
+def history_response(args):
+    """Status, content type and body chunks for a history query"""
+    def number(name):
+        value = args.get(name)
+        if value in (None, ''):
+            return None
+        value = float(value)
+        # nan and inf parse as floats but cannot be bucketed or compared
+        if not math.isfinite(value):
+            raise HistoryQueryError(f"{name} must be a finite number")
+        return value
+
+    def names(name, default=None):
+        value = args.get(name)
+        return tuple(item for item in value.split(',') if item) if value else default
+
+    try:
+        output_format = args.get('format', 'json')
+        if output_format not in FORMATS:
+            raise HistoryQueryError(f"format must be one of {', '.join(FORMATS)}")
+        start, end, since = number('start'), number('end'), number('since')
+        if since is not None:
+            start = time.time() - since
+        step = number('step')
+        aggregates = names('agg', ('avg',))
+        rows = history.query(start, end, names('fields'), step, aggregates)
+    except (HistoryQueryError, ValueError) as error:
+        return 400, 'application/json', [dumps_bytes({'error': 'Bad Request', 'message': str(error)})]
+
+    meta = {
+        'fields': list(names('fields', history.fields)),
+        'step': step,
+        'aggregates': list(aggregates) if step else None,
+        'capacity': history.capacity,
+        'interval': system_sampler.interval
+    }
+    return 200, FORMATS[output_format], encode_rows(rows, output_format, meta)
+
+@app.route('/api/stats/history', methods=['GET'])
+def get_stats_history():
+    """Sampled memory, CPU and request-rate history with optional downsampling"""
+    system_sampler.get()
+    status, content_type, body = history_response(request.args)
+    return app.response_class(body, status=status, content_type=content_type)
+
+def stats_event():
+    """Live dashboard metrics serialized as one SSE message"""
+    time_info = get_time_info()
+    return format_event('stats', dumps({
+        'time': time_info['time'],
+        'day': time_info['day'],
+        'memory_percent': get_system_info()['memory_usage'].get('percent', 'N/A'),
+        'uptime': round(get_uptime(), 1),
+        'timestamp': clock.isoformat()
+    }).rstrip('\n'))
+
+stats_stream = EventBroadcaster(stats_event, float(os.getenv('STATS_STREAM_INTERVAL', 1.0)))
+
+STREAM_UNAVAILABLE_BODY = dumps_bytes({
+    'error': 'Not Implemented',
+    'message': 'Live statistics are streamed in SERVER_MODE=async; poll /api/stats instead'
+})
+
+@app.route('/api/stats/stream', methods=['GET'])
+def get_stats_stream():
+    """Server-Sent Events are only served by the ASGI app in asgi.py"""
+    # A WSGI stream would hold a worker thread per viewer. Any status but
+    # 200 makes EventSource give up instead of reconnecting.
+    return app.response_class(STREAM_UNAVAILABLE_BODY, status=501, mimetype='application/json')
+
+JSON_BODY = JsonBodyCache({
+    'message': "${{ values.app_name | title }} Application",
+    'status': 'running',
+    'version': '1.0.0',
+    'themes': list(THEMES.keys()),
+    'endpoints': API_ENDPOINTS + ['/api/json - JSON response (this endpoint)']
+}, dynamic_fields=('greeting',) + TIME_FIELDS)
+
 @app.route('/api/json', methods=['GET'])
 def get_json():
     """Complete application data in JSON format"""
     user = get_user()
     time_info = get_time_info()
     
-    return jsonify({
-        'message': "${{ values.app_name | title }} Application",
-        'greeting': f"Hello {user}",
-        'timestamp': time_info['timestamp'],
-        'date': time_info['date'],
-        'time': time_info['time'],
-        'day': time_info['day'],
-        'status': 'running',
-        'version': '1.0.0',
-        'themes': list(THEMES.keys()),
-        'endpoints': [
-            '/ - Beautiful colorful web interface',
-            '/api/details - Get application details',
-            '/health - Health check',
-            '/api/stats - Get system statistics',
-            '/api/json - JSON response (this endpoint)'
-        ]
-    })
+    return cached_json(JSON_BODY, greeting=f"Hello {user}", **time_info)
+
+NOT_FOUND_BODY = JsonBodyCache({
+    'error': 'Not Found',
+    'message': 'The requested endpoint does not exist',
+    'available_endpoints': API_ENDPOINTS + ['/api/json - JSON response']
+})
 
 @app.errorhandler(404)
 def not_found(error):
     """404 error handler"""
-    return jsonify({
-        'error': 'Not Found',
-        'message': 'The requested endpoint does not exist',
-        'available_endpoints': [
-            '/ - Beautiful colorful web interface',
-            '/api/details - Get application details',
-            '/health - Health check',
-            '/api/stats - Get system statistics',
-            '/api/json - JSON response'
-        ]
-    }), 404
+    body, _ = NOT_FOUND_BODY.render({})
+    return app.response_class(body, status=404, mimetype='application/json')
+
+startup.finish_import()
 
 if __name__ == "__main__":
     port = int(os.getenv('PORT', 8082))
-    app.run(host='0.0.0.0', port=port, debug=False) 
+    server_mode = os.getenv('SERVER_MODE', 'dev')
+    if server_mode == 'dev':
+        app.run(host='0.0.0.0', port=port, debug=False)
+    else:
+        # Let `import app` elsewhere reuse this module instead of loading it twice
+        sys.modules.setdefault('app', sys.modules[__name__])
+        import server
+        server.serve(server_mode, port)
+
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""Native ASGI application serving the dashboard routes on an event loop.
+
+This is an alternative to the Flask views in app.py for the async server
+mode. It serves the same routes with the same response bodies, reusing
+the render and response caches from app.py, but holds each connection
+as a coroutine instead of a thread. Anything that may block on psutil
+runs on the default thread pool executor.
+"""
+
+import asyncio
+import time
+from urllib.parse import parse_qs
+
+import debug
+import metrics
+from accesslog import access_log
+from admission import SHED_BODY, admission
+from app import (DETAILS_BODY, JSON_BODY, NOT_FOUND_BODY, assets, dashboard_page,
+                 get_time_info, get_user, health_payload, history_response,
+                 probes, stats_payload, stats_stream)
+from startup import startup
+from compression import choose_encoding
+from responses import dumps_bytes
+from runtime import runtime
+from sampler import system_sampler
+
+JSON_HEADERS = [(b'content-type', b'application/json')]
+HTML_HEADERS = [(b'content-type', b'text/html; charset=utf-8')]
+PROBE_HEADERS = [(b'content-type', b'application/json'), (b'cache-control', b'no-store')]
+ERROR_HEADERS = [(b'content-type', b'text/plain; charset=utf-8')]
+ERROR_BODY = b'Internal Server Error'
+SHED_HEADERS = [(name.lower().encode(), value.encode()) for name, value in admission.headers]
+
+async def system_info():
+    """System snapshot, sampling off the event loop when it is stale"""
+    return await system_sampler.get_async()
+
+def header(scope, name):
+    """First value of a request header, or an empty string"""
+    for key, value in scope['headers']:
+        if key == name:
+            return value.decode('latin-1')
+    return ''
+
+def etag_matches(scope, etag):
+    """Whether the request's If-None-Match header matches an ETag"""
+    tags = [tag.strip().removeprefix('W/').strip('"') for tag in header(scope, b'if-none-match').split(',')]
+    return etag in tags or '*' in tags
+
+def cached_json(scope, body_cache, values):
+    """Conditional JSON response from a pre-serialized body"""
+    body, etag = body_cache.render(values)
+    headers = JSON_HEADERS + [(b'etag', f'"{etag}"'.encode())]
+    if etag_matches(scope, etag):
+        return 304, headers, b''
+    return 200, headers, body
+
+async def dashboard(scope):
+    query = parse_qs(scope['query_string'].decode('latin-1'))
+    current_theme = query.get('theme', ['aurora'])[0]
+    encoding = choose_encoding(header(scope, b'accept-encoding'))
+    page = dashboard_page(current_theme, await system_info(), encoding)
+    headers = HTML_HEADERS + [(b'vary', b'Accept-Encoding')]
+    if encoding != 'identity':
+        headers.append((b'content-encoding', encoding.encode()))
+    return 200, headers, page
+
+async def get_details(scope):
+    values = dict(get_time_info(), message=f"Hello {get_user()}")
+    return cached_json(scope, DETAILS_BODY, values)
+
+async def health_check(scope):
+    return 200, JSON_HEADERS, dumps_bytes(health_payload(await system_info()))
+
+async def get_stats(scope):
+    info = await system_info()
+    if runtime.stale():
+        # psutil and /proc reads stay off the event loop
+        await asyncio.get_running_loop().run_in_executor(None, runtime.publish)
+    return 200, JSON_HEADERS, dumps_bytes(stats_payload(info))
+
+async def get_stats_history(scope):
+    await system_info()
+    query = {name: values[0] for name, values in parse_qs(scope['query_string'].decode('latin-1')).items()}
+    status, content_type, body = history_response(query)
+    return status, [(b'content-type', content_type.encode())], b''.join(body)
+
+async def get_json(scope):
+    values = dict(get_time_info(), greeting=f"Hello {get_user()}")
+    return cached_json(scope, JSON_BODY, values)
+
+async def get_metrics(scope):
+    body = await asyncio.get_running_loop().run_in_executor(None, metrics.collect)
+    return 200, [(b'content-type', metrics.CONTENT_TYPE_LATEST.encode())], body
+
+async def debug_profile(scope):
+    query = {name: values[0] for name, values in parse_qs(scope['query_string'].decode('latin-1')).items()}
+    status, content_type, body = await asyncio.get_running_loop().run_in_executor(
+        None, debug.profile_response, query, header(scope, b'authorization'))
+    headers = [(b'content-type', content_type.encode()), (b'cache-control', b'no-store')]
+    if status == 401:
+        headers.append((b'www-authenticate', b'Bearer'))
+    return status, headers, body
+
+async def debug_memory(scope):
+    action = scope['path'].removeprefix('/debug/memory').removeprefix('/')
+    query = {name: values[0] for name, values in parse_qs(scope['query_string'].decode('latin-1')).items()}
+    status, content_type, body = await asyncio.get_running_loop().run_in_executor(
+        None, debug.memory_response, action, scope['method'], query, header(scope, b'authorization'))
+    headers = [(b'content-type', content_type.encode()), (b'cache-control', b'no-store')]
+    if status == 401:
+        headers.append((b'www-authenticate', b'Bearer'))
+    return status, headers, body
+
+async def static_asset(scope):
+    asset = assets.lookup(scope['path'])
+    if asset is not None:
+        body, headers = asset.response_parts(header(scope, b'accept-encoding'))
+    else:
+        # Files that are not fingerprinted are read from disk, off the event loop
+        found = await asyncio.get_running_loop().run_in_executor(None, assets.read_file, scope['path'])
+        if found is None:
+            return await not_found(scope)
+        body, headers = found
+    return 200, [(name.lower().encode(), value.encode()) for name, value in headers], body
+
+async def not_found(scope):
+    body, _ = NOT_FOUND_BODY.render({})
+    return 404, JSON_HEADERS, body
+
+# Handler names match the Flask endpoint names so metrics line up
+ROUTES = {
+    '/': ('dashboard', dashboard),
+    '/api/details': ('get_details', get_details),
+    '/health': ('health_check', health_check),
+    '/api/stats': ('get_stats', get_stats),
+    '/api/stats/history': ('get_stats_history', get_stats_history),
+    '/api/json': ('get_json', get_json),
+    '/metrics': ('metrics', get_metrics)
+}
+if debug.DEBUG_TOKEN:
+    ROUTES['/debug/profile'] = ('debug_profile', debug_profile)
+
+SSE_HEADERS = [(b'content-type', b'text/event-stream; charset=utf-8'),
+               (b'cache-control', b'no-cache'),
+               (b'x-accel-buffering', b'no')]
+
+async def get_stats_stream(scope, receive, send):
+    """Server-Sent Events stream; each client is a coroutine, not a thread"""
+    if stats_stream.latest[0] == 0:
+        await asyncio.get_running_loop().run_in_executor(None, stats_stream.start)
+
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+    await send({'type': 'http.response.start', 'status': 200, 'headers': SSE_HEADERS})
+    seq, payload = stats_stream.latest
+    await send({'type': 'http.response.body', 'body': stats_stream.preamble + payload, 'more_body': True})
+    try:
+        while True:
+            next_event = asyncio.ensure_future(stats_stream.wait_async(seq))
+            await asyncio.wait((next_event, disconnected), return_when=asyncio.FIRST_COMPLETED)
+            if disconnected.done():
+                next_event.cancel()
+                return 200
+            seq, payload = next_event.result()
+            await send({'type': 'http.response.body', 'body': payload, 'more_body': True})
+    finally:
+        disconnected.cancel()
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+# Handlers that drive the response themselves, e.g. long-lived streams
+STREAMS = {
+    '/api/stats/stream': ('get_stats_stream', get_stats_stream)
+}
+
+async def shed(name, scope, send):
+    """Send a 503 if admission control rejects the request"""
+    if not admission.admit(name, header(scope, b'x-request-start')):
+        return False
+    await send({'type': 'http.response.start', 'status': 503, 'headers': SHED_HEADERS})
+    await send({'type': 'http.response.body', 'body': SHED_BODY})
+    return True
+
+class LoggedSend:
+    """ASGI send callable that adds X-Request-ID and counts the body bytes"""
+
+    def __init__(self, send, request_id):
+        self.send = send
+        self.request_id = request_id
+        self.started = False
+        self.sent = 0
+
+    async def __call__(self, message):
+        if message['type'] == 'http.response.start':
+            self.started = True
+            message = dict(message, headers=list(message['headers']) + [(b'x-request-id', self.request_id.encode())])
+        elif message['type'] == 'http.response.body':
+            self.sent += len(message.get('body', b''))
+        await self.send(message)
+
+async def server_error(send):
+    """Answer 500 for a handler that raised, unless its response has already started"""
+    if not send.started:
+        await send({'type': 'http.response.start', 'status': 500, 'headers': ERROR_HEADERS})
+        await send({'type': 'http.response.body', 'body': ERROR_BODY})
+
+def finish(name, scope, send, status, started, observe=metrics.observe):
+    """Record a finished request in the metrics and the access log"""
+    elapsed = time.perf_counter() - started
+    observe(name, scope['method'], status, elapsed)
+    client = scope.get('client')
+    access_log.record(time.time(), send.request_id, scope['method'], scope['path'], name,
+                      status, elapsed * 1000, send.sent, client[0] if client else None)
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            system_sampler.start()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def application(scope, receive, send):
+    """ASGI entry point"""
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    path = scope['path']
+    method = scope['method']
+    probe = probes.respond(path, method)
+    if probe is not None:
+        status, body = probe
+        headers = PROBE_HEADERS + [(b'content-length', str(len(body)).encode())]
+        if status == 405:
+            headers.append((b'allow', b'GET, HEAD'))
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': b'' if method == 'HEAD' else body})
+        return
+
+    started = time.perf_counter()
+    send = LoggedSend(send, access_log.request_id(header(scope, b'x-request-id')))
+    if path in STREAMS and method == 'GET':
+        name, stream = STREAMS[path]
+        # Streams stay open for as long as a dashboard does, so they are
+        # neither admitted nor counted as in-flight work
+        metrics.stream_opened(name)
+        status = 500
+        try:
+            status = await stream(scope, receive, send)
+        except Exception:
+            await server_error(send)
+            raise
+        finally:
+            metrics.stream_closed(name)
+            # A stream's lifetime is not a response latency
+            finish(name, scope, send, status, started, observe=metrics.observe_stream)
+        return
+
+    if path in ROUTES:
+        name, handler = ROUTES[path]
+    elif path.startswith(assets.url_prefix):
+        name, handler = 'static', static_asset
+    elif debug.DEBUG_TOKEN and (path == '/debug/memory' or path.startswith('/debug/memory/')):
+        # Handles its own methods, since some actions are POST
+        name, handler = 'debug_memory', debug_memory
+    else:
+        name, handler = 'not_found', not_found
+    if await shed(name, scope, send):
+        finish(name, scope, send, 503, started)
+        return
+    metrics.request_started(name)
+    status = 500
+    try:
+        if method in ('GET', 'HEAD') or handler in (not_found, debug_memory):
+            status, headers, body = await handler(scope)
+        else:
+            status, headers, body = 405, JSON_HEADERS + [(b'allow', b'GET, HEAD')], b''
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': b'' if method == 'HEAD' else body})
+        startup.record_first_byte()
+    except Exception:
+        # Counted and logged as a 500; the server still logs the traceback
+        status = 500
+        await server_error(send)
+        raise
+    finally:
+        metrics.request_finished(name)
+        admission.release()
+        finish(name, scope, send, status, started)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Content-fingerprinted static assets.
+
+Every asset is registered under a name that embeds a hash of its content
+(``css/dashboard.css`` becomes ``css/dashboard.1a2b3c4d5e6f.css``), so its
+URL changes whenever its content does and browsers can cache it forever.
+Assets are loaded into memory once, precompressed, and served with
+``Cache-Control: immutable``. Precompression is deferred according to
+STARTUP_MODE (see startup.py). Generated assets, such as the per-theme
+stylesheets, are registered the same way as files from ``static/``.
+"""
+
+import hashlib
+import mimetypes
+import os
+
+from flask import request
+
+from compression import PrecompressedPage, choose_encoding
+from startup import Deferred
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+class Asset:
+    """An in-memory asset with precompressed variants"""
+
+    def __init__(self, content, content_type):
+        self.page = Deferred(lambda: PrecompressedPage([content]))
+        self.content_type = content_type
+        self.etag = hashlib.sha256(content.encode()).hexdigest()[:12]
+
+    def response_parts(self, accept_encoding):
+        """Body bytes and headers for a request with the given Accept-Encoding"""
+        encoding = choose_encoding(accept_encoding)
+        headers = [
+            ('Content-Type', self.content_type),
+            ('Cache-Control', IMMUTABLE),
+            ('ETag', f'"{self.etag}"'),
+            ('Vary', 'Accept-Encoding')
+        ]
+        if encoding != 'identity':
+            headers.append(('Content-Encoding', encoding))
+        return self.page.get().render({}, encoding), headers
+
+class AssetManifest:
+    """Map logical asset paths to fingerprinted URLs and serve them"""
+
+    def __init__(self, folder, url_prefix='/static/'):
+        self.folder = folder
+        self.url_prefix = url_prefix
+        self.urls = {}
+        self.assets = {}
+
+    def add(self, path, content=None):
+        """Register an asset, read from the folder unless content is given"""
+        if content is None:
+            with open(os.path.join(self.folder, path), encoding='utf-8') as f:
+                content = f.read()
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type.endswith('javascript'):
+            content_type += '; charset=utf-8'
+
+        asset = Asset(content, content_type)
+        stem, ext = os.path.splitext(path)
+        fingerprinted = f'{stem}.{asset.etag}{ext}'
+        self.assets[fingerprinted] = asset
+        self.urls[path] = self.url_prefix + fingerprinted
+        return self.urls[path]
+
+    def url(self, path):
+        """Fingerprinted URL of a registered asset"""
+        return self.urls[path]
+
+    def lookup(self, url_path):
+        """Asset for a request path under the URL prefix, if there is one"""
+        return self.assets.get(url_path[len(self.url_prefix):])
+
+    def read_file(self, url_path):
+        """Body and headers of an unregistered file in the folder, or None
+
+        The fallback for servers without Flask's static route; like
+        send_static_file, it refuses paths that resolve outside the folder.
+        """
+        root = os.path.realpath(self.folder)
+        try:
+            path = os.path.realpath(os.path.join(root, url_path[len(self.url_prefix):]))
+            if os.path.commonpath((root, path)) != root or not os.path.isfile(path):
+                return None
+            with open(path, 'rb') as f:
+                body = f.read()
+        except (ValueError, OSError):
+            # An embedded NUL, or a file that cannot be read, is just not found
+            return None
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type.endswith('javascript'):
+            content_type += '; charset=utf-8'
+        # Not fingerprinted, so browsers must revalidate rather than cache it
+        return body, [('Content-Type', content_type), ('Cache-Control', 'no-cache')]
+
+    def init_app(self, app):
+        """Serve fingerprinted assets from the app's static route"""
+        send_static_file = app.view_functions['static']
+
+        def static(filename):
+            asset = self.assets.get(filename)
+            if asset is None:
+                return send_static_file(filename=filename)
+            body, headers = asset.response_parts(request.headers.get('Accept-Encoding', ''))
+            return app.response_class(body, headers=headers)
+
+        app.view_functions['static'] = static
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""Load-testing harness for the dashboard endpoints.
+
+Starts the application in-process (Werkzeug, threaded) or as a
+subprocess (``python app.py`` in any SERVER_MODE), or targets an already
+running server, then drives each endpoint in turn from a pool of client
+threads holding keep-alive connections. For every endpoint it reports
+throughput and latency percentiles, and it samples the resident memory
+of every server process. Results are written as JSON so runs can be
+compared between commits:
+
+    python benchmarks/load.py --server subprocess --server-mode threaded \\
+        --concurrency 32 --duration 10 --output results.json
+    python benchmarks/load.py --compare results.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+import psutil
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_ENDPOINTS = ['/', '/health', '/api/stats', '/api/json', '/api/details']
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def free_port():
+    """Ask the OS for an unused TCP port"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def wait_until_ready(host, port, timeout=30.0):
+    """Poll /health until the server answers"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        conn = http.client.HTTPConnection(host, port, timeout=1)
+        try:
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        finally:
+            conn.close()
+        # Not listening yet, or listening but not healthy yet
+        time.sleep(0.1)
+    raise RuntimeError(f"Server on port {port} did not become ready within {timeout}s")
+
+class InProcessServer:
+    """The Flask app on a threaded Werkzeug server in this process"""
+
+    def __init__(self):
+        sys.path.insert(0, APP_DIR)
+        from werkzeug.serving import WSGIRequestHandler, make_server
+        from app import app
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args, **kwargs):
+                pass
+
+        self.server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+        self.host, self.port = '127.0.0.1', self.server.server_port
+        self.pid = os.getpid()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+
+class SubprocessServer:
+    """``python app.py`` in a child process"""
+
+    def __init__(self, server_mode, workers):
+        self.host, self.port = '127.0.0.1', free_port()
+        env = dict(os.environ, PORT=str(self.port), SERVER_MODE=server_mode)
+        if workers:
+            env['WEB_CONCURRENCY'] = str(workers)
+        self.process = subprocess.Popen([sys.executable, 'app.py'], cwd=APP_DIR, env=env,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.pid = self.process.pid
+        try:
+            wait_until_ready(self.host, self.port)
+        except BaseException:
+            # The caller never gets a server to stop, so do not leak the child
+            self.stop()
+            raise
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+class ExternalServer:
+    """A server that is already running, possibly on another host"""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.pid = None
+
+    def stop(self):
+        pass
+
+def process_rss(pid):
+    """Resident memory of a server process and each of its workers"""
+    if pid is None:
+        return {}
+    try:
+        root = psutil.Process(pid)
+        processes = [root] + root.children(recursive=True)
+    except psutil.NoSuchProcess:
+        return {}
+    rss = {}
+    for process in processes:
+        try:
+            rss[str(process.pid)] = process.memory_info().rss
+        except psutil.NoSuchProcess:
+            pass
+    return rss
+
+def client_loop(host, port, path, deadline, latencies, errors, headers):
+    """Issue requests on one keep-alive connection until the deadline"""
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    samples = []
+    failures = 0
+    while True:
+        started = time.perf_counter()
+        if started >= deadline:
+            break
+        try:
+            conn.request('GET', path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 500:
+                failures += 1
+            else:
+                samples.append(time.perf_counter() - started)
+        except (OSError, http.client.HTTPException):
+            failures += 1
+            conn.close()
+    conn.close()
+    latencies.extend(samples)
+    errors.append(failures)
+
+def drive(server, path, concurrency, duration, headers):
+    """Load one endpoint and summarise the run"""
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=client_loop,
+                                args=(server.host, server.port, path, deadline, latencies, errors, headers))
+               for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    to_ms = lambda value: None if value is None else round(value * 1000, 3)
+    return {
+        'requests': len(latencies),
+        'errors': sum(errors),
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'latency_ms': {
+            'mean': to_ms(sum(latencies) / len(latencies)) if latencies else None,
+            'p50': to_ms(percentile(latencies, 0.50)),
+            'p95': to_ms(percentile(latencies, 0.95)),
+            'p99': to_ms(percentile(latencies, 0.99)),
+            'max': to_ms(latencies[-1] if latencies else None)
+        }
+    }
+
+def git_commit():
+    """Current commit of the application checkout, if it is a git repo"""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=APP_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(baseline_path, results):
+    """Print throughput and p99 changes against a baseline result file"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('commit')}):")
+    for path, current in results['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(path)
+        if not before or not before['throughput_rps'] or not before['latency_ms']['p99']:
+            continue
+        rps_change = (current['throughput_rps'] / before['throughput_rps'] - 1) * 100
+        p99_change = ((current['latency_ms']['p99'] or 0) / before['latency_ms']['p99'] - 1) * 100
+        print(f"  {path:<14} throughput {rps_change:+7.1f}%   p99 {p99_change:+7.1f}%")
+
+def print_report(results):
+    print(f"{'endpoint':<14} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for path, stats in results['endpoints'].items():
+        latency = stats['latency_ms']
+        print(f"{path:<14} {stats['throughput_rps']:>10} {latency['p50'] or '-':>9} "
+              f"{latency['p95'] or '-':>9} {latency['p99'] or '-':>9} {stats['errors']:>7}")
+    for pid, rss in results['rss_bytes'].items():
+        print(f"rss pid {pid}: {rss / 1048576:.1f} MiB")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--server', choices=('inprocess', 'subprocess', 'external'), default='subprocess',
+                        help='how to run the application under test')
+    parser.add_argument('--server-mode', default=os.getenv('SERVER_MODE', 'threaded'),
+                        help='SERVER_MODE for --server subprocess')
+    parser.add_argument('--workers', type=int, help='WEB_CONCURRENCY for --server subprocess')
+    parser.add_argument('--url', default='http://127.0.0.1:8082', help='base URL for --server external')
+    parser.add_argument('--endpoints', nargs='+', default=DEFAULT_ENDPOINTS)
+    parser.add_argument('--concurrency', type=int, default=16, help='concurrent client connections')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per endpoint')
+    parser.add_argument('--warmup', type=float, default=1.0, help='unmeasured seconds per endpoint')
+    parser.add_argument('--header', action='append', default=[], metavar='NAME:VALUE',
+                        help='extra request header, e.g. Accept-Encoding:gzip')
+    parser.add_argument('--output', help='write JSON results to this file')
+    parser.add_argument('--compare', metavar='BASELINE', help='compare against an earlier JSON result')
+    args = parser.parse_args(argv)
+
+    headers = dict(item.split(':', 1) for item in args.header)
+    if args.server == 'inprocess':
+        server = InProcessServer()
+    elif args.server == 'subprocess':
+        server = SubprocessServer(args.server_mode, args.workers)
+    else:
+        server = ExternalServer(args.url)
+
+    try:
+        results = {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+            'config': {
+                'server': args.server,
+                'server_mode': args.server_mode if args.server == 'subprocess' else None,
+                'workers': args.workers,
+                'concurrency': args.concurrency,
+                'duration': args.duration,
+                'headers': headers
+            },
+            'endpoints': {}
+        }
+        for path in args.endpoints:
+            if args.warmup:
+                drive(server, path, args.concurrency, args.warmup, headers)
+            results['endpoints'][path] = drive(server, path, args.concurrency, args.duration, headers)
+        results['rss_bytes'] = process_rss(server.pid)
+    finally:
+        server.stop()
+
+    print_report(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        compare(args.compare, results)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Round-trip check for the precompressed page encodings.
+
+compression.py assembles gzip and zstd responses from pieces compressed
+ahead of time: raw deflate runs ended by a full flush, spliced with
+stored blocks, and concatenated zstd frames. Those bodies are only valid
+because of careful byte-level framing, so this decodes every variant
+with the standard decoders (``gzip.decompress`` and zstandard's
+``stream_reader(..., read_across_frames=True)``) and compares the result
+with the identity body. It covers each theme's dashboard page, every
+registered static asset, and synthetic pages whose values cross the
+stored-block and frame-header size boundaries. Exits non-zero on any
+mismatch, so it can gate CI:
+
+    python benchmarks/precompressed.py
+"""
+
+import argparse
+import gzip
+import io
+import sys
+
+from load import APP_DIR
+
+sys.path.insert(0, APP_DIR)
+
+from compression import MAX_STORED_BLOCK, SUPPORTED_ENCODINGS, PrecompressedPage, zstandard
+
+# Dynamic values around every size where the framing changes
+VALUE_SIZES = (0, 1, 255, 256, 257, MAX_STORED_BLOCK, MAX_STORED_BLOCK + 1,
+               65791, 65792, 128 * 1024, 128 * 1024 + 1, 300000)
+
+def decode(body, encoding):
+    """Decode a response body with the standard library or zstandard"""
+    if encoding == 'gzip':
+        return gzip.decompress(body)
+    if encoding == 'zstd':
+        reader = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(body), read_across_frames=True)
+        return reader.read()
+    return body
+
+def check(label, page, values):
+    """Failures for one page rendered with one set of values"""
+    identity = page.render(values)
+    failures = []
+    for encoding in SUPPORTED_ENCODINGS:
+        try:
+            decoded = decode(page.render(values, encoding), encoding)
+        except Exception as exc:
+            failures.append(f"{label} [{encoding}]: {type(exc).__name__}: {exc}")
+            continue
+        if decoded != identity:
+            failures.append(f"{label} [{encoding}]: decodes to {len(decoded)} bytes, expected {len(identity)}")
+    return failures
+
+def synthetic_cases():
+    """Pages whose dynamic values cross the framing size boundaries"""
+    page = PrecompressedPage(['<p>', 'value', '</p>\n' * 100, 'other', ''])
+    for size in VALUE_SIZES:
+        yield f"synthetic value of {size} bytes", page, {'value': 'v' * size, 'other': 'é' * (size // 2)}
+    # A page that starts and ends with a field, with empty static chunks around it
+    yield "synthetic field only", PrecompressedPage(['', 'value', '']), {'value': 'only'}
+    yield "synthetic static only", PrecompressedPage(['static ' * 5000]), {}
+
+def app_cases():
+    """Every theme's dashboard page and every registered static asset"""
+    import app
+
+    values = {'user': 'Ada & <Lovelace>', 'time': '12:34:56', 'day': 'Sunday',
+              'memory_percent': 42.5, 'uptime': 3600.0}
+    for name, page in app.DASHBOARD_PAGES.items():
+        yield f"dashboard {name}", page.get(), values
+    for path, asset in app.assets.assets.items():
+        yield f"asset {path}", asset.page.get(), {}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--synthetic-only', action='store_true',
+                        help='skip the application pages and assets')
+    args = parser.parse_args(argv)
+
+    cases = list(synthetic_cases())
+    if not args.synthetic_only:
+        cases.extend(app_cases())
+    failures = []
+    for label, page, values in cases:
+        failures.extend(check(label, page, values))
+
+    print(f"Checked {len(cases)} pages in {', '.join(SUPPORTED_ENCODINGS)}")
+    for failure in failures:
+        print(f"  {failure}")
+    if failures:
+        print(f"FAIL: {len(failures)} encoded bodies did not round-trip")
+        return 1
+    print("OK: every encoded body decodes to the identity body")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
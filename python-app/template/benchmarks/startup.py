@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Cold-start benchmark with an import-time budget.
+
+Imports the application in fresh interpreters and reports the median
+time to import it, then starts ``python app.py`` and measures the time
+until the first response. Exits non-zero when the median import time is
+over budget, so it can gate CI:
+
+    python benchmarks/startup.py --startup-mode lazy --budget-ms 400
+    python benchmarks/startup.py --importtime 15
+"""
+
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from load import APP_DIR, free_port
+
+IMPORT_PROBE = (
+    "import time\n"
+    "started = time.perf_counter()\n"
+    "import app\n"
+    "print(time.perf_counter() - started)\n"
+)
+
+def measure_import(env):
+    """Seconds to import app.py in a fresh interpreter"""
+    output = subprocess.check_output([sys.executable, '-c', IMPORT_PROBE], cwd=APP_DIR, env=env,
+                                     stderr=subprocess.DEVNULL, text=True)
+    return float(output.strip().splitlines()[-1])
+
+def measure_first_byte(env, path, timeout=30.0):
+    """Seconds from spawning ``python app.py`` to its first successful response"""
+    port = free_port()
+    env = dict(env, PORT=str(port))
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, 'app.py'], cwd=APP_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < timeout:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+            try:
+                conn.request('GET', path)
+                response = conn.getresponse()
+                response.read()
+                if response.status == 200:
+                    return time.perf_counter() - started
+            except OSError:
+                pass
+            finally:
+                conn.close()
+            # Not listening yet, or not ready to answer 200 yet
+            time.sleep(0.005)
+        raise RuntimeError(f"Server did not answer {path} within {timeout}s")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def slowest_imports(env, count):
+    """The modules with the largest cumulative import time, from -X importtime"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=APP_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.append((int(cumulative), name.rstrip()))
+    return sorted(modules, reverse=True)[:count]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--startup-mode', default=os.getenv('STARTUP_MODE', 'lazy'),
+                        help='STARTUP_MODE for the application under test')
+    parser.add_argument('--server-mode', default='dev', help='SERVER_MODE for the first-byte measurement')
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters to time')
+    parser.add_argument('--budget-ms', type=float, default=float(os.getenv('STARTUP_BUDGET_MS', 500)),
+                        help='fail when the median import time exceeds this')
+    parser.add_argument('--path', default='/', help='request path for the first-byte measurement')
+    parser.add_argument('--importtime', type=int, default=0, metavar='N',
+                        help='also list the N slowest imports')
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ, STARTUP_MODE=args.startup_mode, SERVER_MODE=args.server_mode)
+    imports = sorted(measure_import(env) for _ in range(args.runs))
+    first_bytes = sorted(measure_first_byte(env, args.path) for _ in range(args.runs))
+    results = {
+        'startup_mode': args.startup_mode,
+        'server_mode': args.server_mode,
+        'runs': args.runs,
+        'import_ms': {'median': round(statistics.median(imports) * 1000, 1),
+                      'min': round(imports[0] * 1000, 1), 'max': round(imports[-1] * 1000, 1)},
+        'first_byte_ms': {'median': round(statistics.median(first_bytes) * 1000, 1),
+                          'min': round(first_bytes[0] * 1000, 1), 'max': round(first_bytes[-1] * 1000, 1)},
+        'budget_ms': args.budget_ms
+    }
+
+    print(f"STARTUP_MODE={args.startup_mode} SERVER_MODE={args.server_mode}, {args.runs} runs")
+    for name in ('import_ms', 'first_byte_ms'):
+        stats = results[name]
+        print(f"  {name:<14} median {stats['median']:>8} ms   min {stats['min']:>8}   max {stats['max']:>8}")
+    if args.importtime:
+        print("Slowest imports (cumulative):")
+        for cumulative, name in slowest_imports(env, args.importtime):
+            print(f"  {cumulative / 1000:>8.1f} ms  {name.strip()}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if results['import_ms']['median'] > args.budget_ms:
+        print(f"FAIL: median import {results['import_ms']['median']} ms is over the {args.budget_ms} ms budget")
+        return 1
+    print(f"OK: median import is within the {args.budget_ms} ms budget")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
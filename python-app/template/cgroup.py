@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""Container resource metrics read from cgroup v1 or v2.
+
+Host-wide numbers from psutil describe the node, not the container. This
+collector reads the container's own memory usage and limit, CPU quota,
+CPU throttling counters and pressure-stall information (PSI). Every
+file is opened once and kept open, then re-read with ``os.pread`` at
+offset zero, so a refresh costs one read syscall per file and no path
+lookups.
+"""
+
+import math
+import os
+
+CGROUP_ROOT = '/sys/fs/cgroup'
+# Limits at or above this are the kernel's way of saying "unlimited"
+UNLIMITED = 1 << 62
+
+def own_cgroup_paths():
+    """Map controller name to this process's cgroup path from /proc/self/cgroup"""
+    paths = {}
+    try:
+        with open('/proc/self/cgroup') as f:
+            for line in f:
+                _, controllers, path = line.rstrip('\n').split(':', 2)
+                for controller in (controllers.split(',') if controllers else ['']):
+                    paths[controller] = path
+    except OSError:
+        pass
+    return paths
+
+def parse_flat_keyed(text):
+    """Parse 'key value' lines such as cpu.stat and memory.stat"""
+    values = {}
+    for line in text.splitlines():
+        key, _, value = line.partition(' ')
+        if value.strip().lstrip('-').isdigit():
+            values[key] = int(value)
+    return values
+
+def parse_pressure(text):
+    """Parse PSI lines: some avg10=0.00 avg60=0.00 avg300=0.00 total=0"""
+    pressure = {}
+    for line in text.splitlines():
+        kind, *fields = line.split()
+        stats = dict(field.split('=', 1) for field in fields)
+        pressure[kind] = {
+            'avg10': float(stats['avg10']),
+            'avg60': float(stats['avg60']),
+            'avg300': float(stats['avg300']),
+            'total_seconds': int(stats['total']) / 1e6
+        }
+    return pressure
+
+def limit_or_none(value):
+    return None if value is None or value >= UNLIMITED else value
+
+class CgroupCollector:
+    """Read container resource metrics from files that stay open"""
+
+    def __init__(self, root=CGROUP_ROOT):
+        self.root = root
+        self._fds = {}
+        self.version = self._detect_version()
+        self.files = self._locate_files() if self.version else {}
+
+    def _detect_version(self):
+        if os.path.exists(os.path.join(self.root, 'cgroup.controllers')):
+            return 2
+        if os.path.isdir(os.path.join(self.root, 'memory')):
+            return 1
+        return None
+
+    def _controller_dir(self, controller):
+        """The process's cgroup directory, or the mount root inside a namespace"""
+        paths = own_cgroup_paths()
+        base = self.root if self.version == 2 else os.path.join(self.root, controller)
+        own = paths.get('' if self.version == 2 else controller, '/').lstrip('/')
+        candidate = os.path.join(base, own)
+        return candidate if own and os.path.isdir(candidate) else base
+
+    def _locate_files(self):
+        if self.version == 2:
+            base = self._controller_dir('')
+            files = {
+                'memory.current': os.path.join(base, 'memory.current'),
+                'memory.max': os.path.join(base, 'memory.max'),
+                'memory.stat': os.path.join(base, 'memory.stat'),
+                'cpu.max': os.path.join(base, 'cpu.max'),
+                'cpu.stat': os.path.join(base, 'cpu.stat')
+            }
+            for resource in ('cpu', 'memory', 'io'):
+                files[f'{resource}.pressure'] = os.path.join(base, f'{resource}.pressure')
+            return files
+
+        memory = self._controller_dir('memory')
+        cpu = self._controller_dir('cpu')
+        files = {
+            'memory.current': os.path.join(memory, 'memory.usage_in_bytes'),
+            'memory.max': os.path.join(memory, 'memory.limit_in_bytes'),
+            'memory.stat': os.path.join(memory, 'memory.stat'),
+            'cpu.cfs_quota_us': os.path.join(cpu, 'cpu.cfs_quota_us'),
+            'cpu.cfs_period_us': os.path.join(cpu, 'cpu.cfs_period_us'),
+            'cpu.stat': os.path.join(cpu, 'cpu.stat'),
+            'cpuacct.usage': os.path.join(self._controller_dir('cpuacct'), 'cpuacct.usage')
+        }
+        # cgroup v1 has no per-group PSI; fall back to the system-wide files
+        for resource in ('cpu', 'memory', 'io'):
+            files[f'{resource}.pressure'] = f'/proc/pressure/{resource}'
+        return files
+
+    def read(self, name):
+        """Contents of a cgroup file, or None if it does not exist"""
+        fd = self._fds.get(name)
+        if fd is None:
+            path = self.files.get(name)
+            if path is None:
+                return None
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except OSError:
+                self.files.pop(name)
+                return None
+            self._fds[name] = fd
+        try:
+            return os.pread(fd, 65536, 0).decode()
+        except OSError:
+            return None
+
+    def close(self):
+        """Close the files kept open for re-reading"""
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds.clear()
+
+    def read_int(self, name):
+        text = self.read(name)
+        if text is None:
+            return None
+        text = text.strip()
+        return None if text == 'max' else int(text)
+
+    def memory(self):
+        usage = self.read_int('memory.current')
+        limit = limit_or_none(self.read_int('memory.max'))
+        stat = parse_flat_keyed(self.read('memory.stat') or '')
+        inactive_file = stat.get('inactive_file', stat.get('total_inactive_file', 0))
+        # Working set is what the OOM killer and kubelet compare against the limit
+        working_set = max(usage - inactive_file, 0) if usage is not None else None
+        return {
+            'usage': usage,
+            'working_set': working_set,
+            'limit': limit,
+            'percent': round(working_set / limit * 100, 1) if limit and working_set is not None else None
+        }
+
+    def cpu(self):
+        stat = parse_flat_keyed(self.read('cpu.stat') or '')
+        if self.version == 2:
+            quota, _, period = (self.read('cpu.max') or 'max 100000').strip().partition(' ')
+            quota = None if quota == 'max' else int(quota)
+            period = int(period)
+            usage_seconds = stat.get('usage_usec', 0) / 1e6
+            throttled_seconds = stat.get('throttled_usec', 0) / 1e6
+        else:
+            quota = self.read_int('cpu.cfs_quota_us')
+            quota = None if quota is None or quota < 0 else quota
+            period = self.read_int('cpu.cfs_period_us') or 100000
+            usage_ns = self.read_int('cpuacct.usage')
+            usage_seconds = usage_ns / 1e9 if usage_ns is not None else None
+            throttled_seconds = stat.get('throttled_time', 0) / 1e9
+        return {
+            'quota_cores': round(quota / period, 3) if quota else None,
+            'usage_seconds': usage_seconds,
+            'periods': stat.get('nr_periods', 0),
+            'throttled_periods': stat.get('nr_throttled', 0),
+            'throttled_seconds': throttled_seconds
+        }
+
+    def pressure(self):
+        pressure = {}
+        for resource in ('cpu', 'memory', 'io'):
+            text = self.read(f'{resource}.pressure')
+            if text:
+                pressure[resource] = parse_pressure(text)
+        return pressure
+
+    def collect(self):
+        """Container metrics, or None when not running under a cgroup"""
+        if not self.version:
+            return None
+        return {
+            'cgroup_version': self.version,
+            'memory': self.memory(),
+            'cpu': self.cpu(),
+            'pressure': self.pressure()
+        }
+
+def available_cpus():
+    """Whole CPUs this process can use: its affinity mask, cut to the CPU quota"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    collector = CgroupCollector()
+    try:
+        quota = collector.cpu()['quota_cores'] if collector.version else None
+    finally:
+        collector.close()
+    if quota:
+        # A quota of 1.5 cores still keeps two workers busy part of the time
+        cpus = min(cpus, max(1, math.ceil(quota)))
+    return cpus
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Wall-clock strings cached at one-second granularity.
+
+Every endpoint reports the current time with one-second resolution, so
+the formatted strings only change once per second. The clock formats
+them on the first call in each new second and hands out the same
+shared values until the second rolls over. Uptime is measured against
+the monotonic clock so it is immune to wall-clock adjustments, starting
+from the process group's start time in the shared metrics segment so
+every worker reports the same uptime.
+"""
+
+import time
+from datetime import datetime
+
+from sharedmetrics import segment
+
+class SecondClock:
+    """Formatted timestamps, refreshed at most once per wall-clock second"""
+
+    def __init__(self, started=None):
+        self.started = time.monotonic() if started is None else started
+        # (epoch second, time info dict, ISO 8601 string), swapped atomically
+        self._cached = (None, None, None)
+
+    def _current(self):
+        second = int(time.time())
+        cached = self._cached
+        if cached[0] == second:
+            return cached
+
+        now = datetime.fromtimestamp(second)
+        timestamp = now.strftime('%Y-%m-%d %H:%M:%S')
+        date, clock_time = timestamp.split(' ')
+        info = {
+            'timestamp': timestamp,
+            'date': date,
+            'time': clock_time,
+            'day': now.strftime('%A')
+        }
+        cached = (second, info, f"{date}T{clock_time}")
+        self._cached = cached
+        return cached
+
+    def time_info(self):
+        """Timestamp, date, time and weekday strings for the current second"""
+        return self._current()[1]
+
+    def isoformat(self):
+        """ISO 8601 string for the current second"""
+        return self._current()[2]
+
+    def uptime(self):
+        """Seconds since the clock was started"""
+        return time.monotonic() - self.started
+
+clock = SecondClock(segment.started)
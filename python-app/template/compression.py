@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Precompressed page variants with per-request values spliced in.
+
+A page is a list of static chunks interleaved with dynamic fields. Each
+static chunk is compressed once, ahead of time, into a piece that can be
+concatenated with other pieces without recompressing anything:
+
+- gzip: every chunk is a run of raw deflate blocks ended by a full
+  flush, so it is byte-aligned and independent of the previous window.
+  Dynamic values are emitted as stored (uncompressed) deflate blocks,
+  and the stream is closed with an empty final block and gzip trailer.
+  The only per-request work is the CRC32 of the page.
+- zstd: every chunk is a complete zstd frame, and concatenated frames
+  form a valid zstd stream. Dynamic values are emitted as frames with a
+  single raw block. Needs the optional ``zstandard`` package.
+
+Brotli streams cannot be assembled from independently compressed
+pieces, so it is not offered.
+"""
+
+import struct
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Preferred encodings, best first
+SUPPORTED_ENCODINGS = ('zstd', 'gzip') if zstandard else ('gzip',)
+
+GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x02\xff'
+DEFLATE_FINAL_BLOCK = b'\x03\x00'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+MAX_STORED_BLOCK = 0xffff
+MAX_ZSTD_BLOCK = 128 * 1024
+
+def choose_encoding(accept_encoding):
+    """Pick the best supported content coding from an Accept-Encoding header"""
+    accepted = {}
+    for item in accept_encoding.split(','):
+        coding, _, params = item.partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    for coding in SUPPORTED_ENCODINGS:
+        if accepted.get(coding, accepted.get('*', 0.0)) > 0:
+            return coding
+    return 'identity'
+
+def deflate_chunk(data, level=9):
+    """Raw deflate blocks for data, ending byte-aligned with a full flush"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FULL_FLUSH)
+
+def stored_blocks(data):
+    """Non-final stored deflate blocks holding data uncompressed"""
+    blocks = []
+    for start in range(0, len(data), MAX_STORED_BLOCK):
+        piece = data[start:start + MAX_STORED_BLOCK]
+        blocks.append(struct.pack('<BHH', 0, len(piece), len(piece) ^ 0xffff) + piece)
+    return b''.join(blocks)
+
+def zstd_raw_frame(data):
+    """A single-segment zstd frame holding data in raw (uncompressed) blocks"""
+    size = len(data)
+    # The content size field is 1, 2 (minus 256) or 4 bytes wide
+    if size < 256:
+        header = b'\x20' + struct.pack('<B', size)
+    elif size < 65536 + 256:
+        header = b'\x60' + struct.pack('<H', size - 256)
+    else:
+        header = b'\xa0' + struct.pack('<I', size)
+    blocks = []
+    start = 0
+    while True:
+        piece = data[start:start + MAX_ZSTD_BLOCK]
+        start += len(piece)
+        last = start >= size
+        blocks.append(struct.pack('<I', last | (len(piece) << 3))[:3] + piece)
+        if last:
+            return ZSTD_MAGIC + header + b''.join(blocks)
+
+class PrecompressedPage:
+    """A page template with static chunks precompressed for each encoding"""
+
+    def __init__(self, parts, level=9):
+        self.static = [part.encode() for part in parts[0::2]]
+        self.fields = parts[1::2]
+        self.deflated = [deflate_chunk(chunk, level) for chunk in self.static]
+        if zstandard:
+            compressor = zstandard.ZstdCompressor(level=19, write_content_size=True)
+            self.zstd = [compressor.compress(chunk) for chunk in self.static]
+
+    def render(self, values, encoding='identity'):
+        """Page bytes in the given encoding with dynamic values filled in"""
+        dynamic = [str(values[field]).encode() for field in self.fields] + [b'']
+
+        if encoding == 'gzip':
+            body = [GZIP_HEADER]
+            crc = 0
+            size = 0
+            for chunk, deflated, value in zip(self.static, self.deflated, dynamic):
+                body.append(deflated)
+                body.append(stored_blocks(value))
+                crc = zlib.crc32(value, zlib.crc32(chunk, crc))
+                size += len(chunk) + len(value)
+            body.append(DEFLATE_FINAL_BLOCK)
+            body.append(struct.pack('<II', crc, size & 0xffffffff))
+            return b''.join(body)
+
+        if encoding == 'zstd':
+            body = []
+            for frame, value in zip(self.zstd, dynamic):
+                body.append(frame)
+                if value:
+                    body.append(zstd_raw_frame(value))
+            return b''.join(body)
+
+        body = []
+        for chunk, value in zip(self.static, dynamic):
+            body.append(chunk)
+            body.append(value)
+        return b''.join(body)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Token-protected debugging endpoints for production processes.
+
+The endpoints are only registered when DEBUG_TOKEN is set; otherwise
+they answer 404 like any unknown path. Callers authenticate with
+``Authorization: Bearer <DEBUG_TOKEN>``. Each request is answered by the
+worker process that receives it, so under a pre-fork server it covers
+that worker only.
+
+- ``/debug/profile?seconds=N``: sample every thread's stack for N
+  seconds (default 10, capped at PROFILE_MAX_SECONDS) and return
+  collapsed stacks for flamegraph tools; ``threads=1`` puts the thread
+  name at the root of each stack. Answers 409 in ``prefork`` mode
+- ``/debug/memory``: process memory, garbage collector statistics and
+  object counts by type, plus tracemalloc control under
+  ``/debug/memory/<action>``: ``POST start?frames=N``, ``POST stop``,
+  ``POST snapshot?name=X``, ``top?name=X`` and ``diff?base=X&name=Y``
+  (both take ``limit`` and ``group_by`` = lineno, filename or traceback)
+"""
+
+import hmac
+import os
+
+from flask import request
+
+from memtrace import MEMTRACE_FRAMES, gc_stats, object_counts, process_memory, tracer
+from profiler import PROFILING_SUPPORTED, ProfilerBusy, collapse, sampler
+from responses import dumps_bytes
+
+DEBUG_TOKEN = os.getenv('DEBUG_TOKEN', '')
+
+JSON = 'application/json'
+COLLAPSED = 'text/plain; charset=utf-8'
+
+def error(status, title, message):
+    return status, JSON, dumps_bytes({'error': title, 'message': message})
+
+def check_token(authorization):
+    """An error response for a missing or wrong token, or None"""
+    scheme, _, token = authorization.partition(' ')
+    if scheme.lower() != 'bearer' or not hmac.compare_digest(token.strip().encode(), DEBUG_TOKEN.encode()):
+        return error(401, 'Unauthorized', 'A valid debug token is required')
+    return None
+
+def profile_response(args, authorization):
+    """Status, content type and body for a profile request; blocks for the window"""
+    denied = check_token(authorization)
+    if denied:
+        return denied
+    if not PROFILING_SUPPORTED:
+        return error(409, 'Conflict', 'Sync prefork workers cannot be profiled; '
+                                      'use SERVER_MODE=threaded or async')
+    try:
+        seconds = float(args.get('seconds') or 10)
+        counts = sampler.profile(seconds, by_thread=args.get('threads') == '1')
+    except ValueError as exc:
+        return error(400, 'Bad Request', str(exc))
+    except ProfilerBusy as exc:
+        return error(409, 'Conflict', str(exc))
+    return 200, COLLAPSED, collapse(counts)
+
+def top_args(args):
+    return int(args.get('limit') or 20), args.get('group_by', 'lineno')
+
+def memory_overview(args):
+    return {
+        'pid': os.getpid(),
+        'memory': process_memory(),
+        'tracemalloc': tracer.status(),
+        'gc': gc_stats(),
+        'objects': object_counts(int(args.get('limit') or 20))
+    }
+
+def start_tracing(args):
+    tracer.start(int(args.get('frames') or MEMTRACE_FRAMES))
+    return tracer.status()
+
+def stop_tracing(args):
+    tracer.stop()
+    return tracer.status()
+
+def take_snapshot(args):
+    tracer.take(args.get('name', ''))
+    return tracer.top(args.get('name', ''), *top_args(args))
+
+def snapshot_top(args):
+    return tracer.top(args.get('name', ''), *top_args(args))
+
+def snapshot_diff(args):
+    return tracer.diff(args.get('base', ''), args.get('name', ''), *top_args(args))
+
+# action -> (method, handler taking the query arguments)
+MEMORY_ACTIONS = {
+    '': ('GET', memory_overview),
+    'start': ('POST', start_tracing),
+    'stop': ('POST', stop_tracing),
+    'snapshot': ('POST', take_snapshot),
+    'top': ('GET', snapshot_top),
+    'diff': ('GET', snapshot_diff)
+}
+
+def memory_response(action, method, args, authorization):
+    """Status, content type and body for a /debug/memory request"""
+    denied = check_token(authorization)
+    if denied:
+        return denied
+    if action not in MEMORY_ACTIONS:
+        return error(404, 'Not Found', f"Unknown memory action {action!r}")
+    allowed, handler = MEMORY_ACTIONS[action]
+    if method != allowed and not (allowed == 'GET' and method == 'HEAD'):
+        return error(405, 'Method Not Allowed', f"Use {allowed} for this action")
+    try:
+        return 200, JSON, dumps_bytes(handler(args))
+    except ValueError as exc:
+        return error(400, 'Bad Request', str(exc))
+
+def init_app(app):
+    """Add the debugging endpoints to a Flask app if DEBUG_TOKEN is set"""
+    if not DEBUG_TOKEN:
+        return
+
+    def respond(status, content_type, body):
+        response = app.response_class(body, status=status, content_type=content_type)
+        response.headers['Cache-Control'] = 'no-store'
+        if status == 401:
+            response.headers['WWW-Authenticate'] = 'Bearer'
+        return response
+
+    @app.route('/debug/profile', methods=['GET'])
+    def debug_profile():
+        """Collapsed stacks sampled from every thread of this worker"""
+        return respond(*profile_response(request.args, request.headers.get('Authorization', '')))
+
+    @app.route('/debug/memory', defaults={'action': ''}, methods=['GET', 'POST'])
+    @app.route('/debug/memory/<action>', methods=['GET', 'POST'])
+    def debug_memory(action):
+        """Heap statistics and tracemalloc snapshots for this worker"""
+        return respond(*memory_response(action, request.method, request.args,
+                                        request.headers.get('Authorization', '')))
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""Fixed-size in-memory history of sampled metrics.
+
+Samples are kept in a ring buffer of typed ``array('d')`` columns, one
+per metric plus one for timestamps, so memory use is fixed at start-up
+(8 bytes per value) no matter how long the process runs. Queries copy a
+time range out of the ring and can downsample it into fixed-width
+buckets with min/max/avg/percentile aggregates. Results can be streamed
+as JSON, CSV or NDJSON.
+"""
+
+import math
+import threading
+from array import array
+
+import jsonprovider
+
+FORMATS = {
+    'json': 'application/json',
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson'
+}
+AGGREGATES = ('min', 'max', 'avg', 'p50', 'p90', 'p95', 'p99')
+
+class HistoryQueryError(ValueError):
+    """Raised for an invalid history query"""
+
+def aggregate(values, name):
+    """Aggregate a non-empty list of samples"""
+    if name == 'min':
+        return min(values)
+    if name == 'max':
+        return max(values)
+    if name == 'avg':
+        return sum(values) / len(values)
+    ordered = sorted(values)
+    rank = math.ceil(int(name[1:]) / 100 * len(ordered))
+    return ordered[max(rank, 1) - 1]
+
+class MetricsHistory:
+    """Ring buffer of timestamped samples stored in typed arrays"""
+
+    def __init__(self, capacity, fields):
+        self.capacity = capacity
+        self.fields = tuple(fields)
+        self.timestamps = array('d', bytes(8 * capacity))
+        self.columns = {field: array('d', bytes(8 * capacity)) for field in self.fields}
+        # Total samples ever appended; the next write goes to count % capacity
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def append(self, timestamp, values):
+        """Record one sample; missing or non-numeric values are stored as NaN"""
+        with self._lock:
+            slot = self.count % self.capacity
+            self.timestamps[slot] = timestamp
+            for field in self.fields:
+                value = values.get(field)
+                self.columns[field][slot] = value if isinstance(value, (int, float)) else math.nan
+            self.count += 1
+
+    def select(self, start=None, end=None, fields=None):
+        """Copy out samples with start <= timestamp <= end, oldest first"""
+        fields = fields or self.fields
+        with self._lock:
+            size = min(self.count, self.capacity)
+            first = self.count - size
+            slots = [i % self.capacity for i in range(first, self.count)]
+            timestamps = [self.timestamps[slot] for slot in slots]
+            columns = {field: [self.columns[field][slot] for slot in slots] for field in fields}
+
+        keep = [i for i, timestamp in enumerate(timestamps)
+                if (start is None or timestamp >= start) and (end is None or timestamp <= end)]
+        return [timestamps[i] for i in keep], {field: [values[i] for i in keep] for field, values in columns.items()}
+
+    def query(self, start=None, end=None, fields=None, step=None, aggregates=('avg',)):
+        """Rows of {'timestamp', field: value} or, with step, {field: {aggregate: value}}"""
+        fields = tuple(fields or self.fields)
+        unknown = set(fields) - set(self.fields)
+        if unknown:
+            raise HistoryQueryError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        unknown = set(aggregates) - set(AGGREGATES)
+        if unknown:
+            raise HistoryQueryError(f"Unknown aggregates: {', '.join(sorted(unknown))}")
+        for name, value in (('start', start), ('end', end), ('step', step)):
+            if value is not None and not math.isfinite(value):
+                raise HistoryQueryError(f"{name} must be a finite number")
+        if step is not None and step <= 0:
+            raise HistoryQueryError("step must be a positive number of seconds")
+
+        return self._rows(start, end, fields, step, aggregates)
+
+    def _rows(self, start, end, fields, step, aggregates):
+        timestamps, columns = self.select(start, end, fields)
+        if step is None:
+            for i, timestamp in enumerate(timestamps):
+                row = {'timestamp': timestamp}
+                for field in fields:
+                    value = columns[field][i]
+                    row[field] = None if math.isnan(value) else value
+                yield row
+            return
+
+        bucket_start = None
+        members = []
+        for i, timestamp in enumerate(timestamps + [math.inf]):
+            bucket = math.floor(timestamp / step) * step if timestamp != math.inf else math.inf
+            if bucket != bucket_start and members:
+                row = {'timestamp': bucket_start, 'samples': len(members)}
+                for field in fields:
+                    values = [columns[field][j] for j in members if not math.isnan(columns[field][j])]
+                    row[field] = {name: aggregate(values, name) if values else None for name in aggregates}
+                yield row
+                members = []
+            bucket_start = bucket
+            members.append(i)
+
+def flatten(row):
+    """Flatten aggregate dicts into field_aggregate keys for tabular output"""
+    flat = {}
+    for key, value in row.items():
+        if isinstance(value, dict):
+            for name, aggregated in value.items():
+                flat[f'{key}_{name}'] = aggregated
+        else:
+            flat[key] = value
+    return flat
+
+def encode_rows(rows, output_format, meta):
+    """Stream query rows as bytes in the requested format"""
+    if output_format == 'ndjson':
+        for row in rows:
+            yield jsonprovider.dumps(row) + b'\n'
+    elif output_format == 'csv':
+        header = None
+        for row in rows:
+            flat = flatten(row)
+            if header is None:
+                header = list(flat)
+                yield (','.join(header) + '\n').encode()
+            yield (','.join('' if flat[key] is None else repr(flat[key]) for key in header) + '\n').encode()
+    else:
+        yield jsonprovider.dumps(meta)[:-1] + b',"points":['
+        separator = b''
+        for row in rows:
+            yield separator + jsonprovider.dumps(row)
+            separator = b','
+        yield b']}\n'
+
+class RateTracker:
+    """Turn a monotonically increasing total into a per-second rate"""
+
+    def __init__(self, read_total):
+        self.read_total = read_total
+        self._last = None
+
+    def rate(self, now):
+        total = self.read_total()
+        last, self._last = self._last, (now, total)
+        if last is None or now <= last[0]:
+            return math.nan
+        return (total - last[1]) / (now - last[0])
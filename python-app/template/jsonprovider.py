@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Pluggable JSON encoding for every response the application serves.
+
+``orjson`` is used when it is installed and the standard library
+otherwise. Both encoders produce the same shapes: compact separators,
+UTF-8 text and keys in insertion order unless JSON_SORT_KEYS is set.
+Dates, decimals and other types neither encoder handles natively go
+through Flask's usual conversions, so switching encoders never changes
+what a client sees.
+"""
+
+import json
+import os
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_ENCODERS = ('auto', 'orjson', 'stdlib')
+JSON_ENCODER = os.getenv('JSON_ENCODER', 'auto')
+JSON_SORT_KEYS = os.getenv('JSON_SORT_KEYS', '0').lower() in ('1', 'true', 'yes')
+
+if JSON_ENCODER not in JSON_ENCODERS:
+    raise ValueError(f"Unknown JSON_ENCODER {JSON_ENCODER!r}, expected one of {', '.join(JSON_ENCODERS)}")
+if JSON_ENCODER == 'orjson' and orjson is None:
+    raise ImportError("JSON_ENCODER=orjson but the orjson package is not installed")
+
+_default = DefaultJSONProvider.default
+_stdlib_encoder = json.JSONEncoder(separators=(',', ':'), sort_keys=JSON_SORT_KEYS,
+                                   ensure_ascii=False, default=_default)
+
+def _stdlib_dumps(obj):
+    return _stdlib_encoder.encode(obj).encode()
+
+if orjson is not None and JSON_ENCODER != 'stdlib':
+    # Datetimes are passed through so they keep Flask's HTTP-date format
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    if JSON_SORT_KEYS:
+        _ORJSON_OPTIONS |= orjson.OPT_SORT_KEYS
+
+    def dumps(obj):
+        """Serialize an object to compact UTF-8 JSON bytes"""
+        try:
+            return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+        except TypeError:
+            # Integers wider than 64 bits and other values orjson refuses
+            return _stdlib_dumps(obj)
+
+    loads = orjson.loads
+    encoder_name = 'orjson'
+else:
+    def dumps(obj):
+        """Serialize an object to compact UTF-8 JSON bytes"""
+        return _stdlib_dumps(obj)
+
+    loads = json.loads
+    encoder_name = 'stdlib'
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by the selected encoder"""
+
+    sort_keys = JSON_SORT_KEYS
+    ensure_ascii = False
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # Callers asking for indent or other json.dumps options
+            return super().dumps(obj, **kwargs)
+        return dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj) + b'\n', mimetype=self.mimetype)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""On-demand allocation tracing and heap statistics for leak hunting.
+
+tracemalloc is off until it is started, so it costs nothing by default;
+while it runs every allocation is recorded with its traceback, which
+slows the process down noticeably and uses extra memory. Named
+snapshots are kept in memory (up to MEMTRACE_MAX_SNAPSHOTS, oldest
+dropped first) so the top allocation sites of one snapshot, or the
+growth between two, can be listed by file, line or traceback.
+
+Object counts by type and the garbage collector's per-generation
+statistics are available whether or not tracing is on.
+"""
+
+import gc
+import os
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from profiler import short_path
+from sampler import psutil
+
+MEMTRACE_FRAMES = int(os.getenv('MEMTRACE_FRAMES', 10))
+MEMTRACE_MAX_SNAPSHOTS = int(os.getenv('MEMTRACE_MAX_SNAPSHOTS', 10))
+
+GROUP_BY = ('lineno', 'filename', 'traceback')
+
+# Allocations made by tracemalloc itself and the import machinery are noise
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>')
+)
+
+class MemoryTraceError(ValueError):
+    """Raised for an invalid memory tracing request"""
+
+def describe(traceback, group_by):
+    """Allocation site label: file, file:line, or the whole traceback"""
+    if group_by == 'filename':
+        return short_path(traceback[0].filename)
+    if group_by == 'lineno':
+        return f"{short_path(traceback[0].filename)}:{traceback[0].lineno}"
+    # Oldest frame first, like the profiler's collapsed stacks
+    return [f"{short_path(frame.filename)}:{frame.lineno}" for frame in traceback]
+
+class MemoryTracer:
+    """tracemalloc control plus a bounded set of named snapshots"""
+
+    def __init__(self, max_snapshots=MEMTRACE_MAX_SNAPSHOTS):
+        self.max_snapshots = max_snapshots
+        # name -> (taken at epoch seconds, snapshot), oldest first
+        self.snapshots = {}
+        self._lock = threading.Lock()
+
+    def start(self, frames=MEMTRACE_FRAMES):
+        """Start tracing allocations, keeping up to frames per traceback"""
+        if not 1 <= frames <= 100:
+            raise MemoryTraceError('frames must be between 1 and 100')
+        if tracemalloc.is_tracing():
+            raise MemoryTraceError('tracemalloc is already tracing')
+        tracemalloc.start(frames)
+
+    def stop(self):
+        """Stop tracing and drop every snapshot"""
+        with self._lock:
+            self.snapshots.clear()
+        tracemalloc.stop()
+
+    def take(self, name):
+        """Take a named snapshot, replacing any older one of the same name"""
+        if not tracemalloc.is_tracing():
+            raise MemoryTraceError('tracemalloc is not tracing; start it first')
+        if not name:
+            raise MemoryTraceError('a snapshot name is required')
+        snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        with self._lock:
+            self.snapshots.pop(name, None)
+            self.snapshots[name] = (time.time(), snapshot)
+            while len(self.snapshots) > self.max_snapshots:
+                del self.snapshots[next(iter(self.snapshots))]
+        return snapshot
+
+    def get(self, name):
+        try:
+            return self.snapshots[name][1]
+        except KeyError:
+            raise MemoryTraceError(f"no snapshot named {name!r}") from None
+
+    @staticmethod
+    def _check_group_by(group_by):
+        if group_by not in GROUP_BY:
+            raise MemoryTraceError(f"group_by must be one of {', '.join(GROUP_BY)}")
+
+    def top(self, name, limit=20, group_by='lineno'):
+        """Largest allocation sites in a snapshot"""
+        self._check_group_by(group_by)
+        stats = self.get(name).statistics(group_by)
+        return {
+            'snapshot': name,
+            'group_by': group_by,
+            'total_size': sum(stat.size for stat in stats),
+            'top': [{'site': describe(stat.traceback, group_by), 'size': stat.size, 'count': stat.count}
+                    for stat in stats[:limit]]
+        }
+
+    def diff(self, base, name, limit=20, group_by='lineno'):
+        """Allocation sites that grew the most between two snapshots"""
+        self._check_group_by(group_by)
+        stats = self.get(name).compare_to(self.get(base), group_by)
+        return {
+            'base': base,
+            'snapshot': name,
+            'group_by': group_by,
+            'size_diff': sum(stat.size_diff for stat in stats),
+            'top': [{'site': describe(stat.traceback, group_by), 'size': stat.size, 'size_diff': stat.size_diff,
+                     'count': stat.count, 'count_diff': stat.count_diff}
+                    for stat in stats[:limit]]
+        }
+
+    def status(self):
+        """Tracing state and the snapshots kept"""
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        with self._lock:
+            snapshots = [{'name': name, 'taken_at': taken_at} for name, (taken_at, _) in self.snapshots.items()]
+        return {
+            'tracing': tracing,
+            'frames': tracemalloc.get_traceback_limit() if tracing else None,
+            'traced': {'current': current, 'peak': peak},
+            'overhead': tracemalloc.get_tracemalloc_memory() if tracing else 0,
+            'snapshots': snapshots
+        }
+
+def object_counts(limit=20):
+    """Most common types among the objects tracked by the garbage collector"""
+    counts = Counter(type(obj).__qualname__ for obj in gc.get_objects())
+    return {
+        'total': sum(counts.values()),
+        'top': [{'type': name, 'count': count} for name, count in counts.most_common(limit)]
+    }
+
+def gc_stats():
+    """Collector thresholds, pending counts and per-generation totals"""
+    return {
+        'enabled': gc.isenabled(),
+        'threshold': list(gc.get_threshold()),
+        'count': list(gc.get_count()),
+        'frozen': gc.get_freeze_count(),
+        'garbage': len(gc.garbage),
+        'generations': gc.get_stats()
+    }
+
+def process_memory():
+    """Resident and virtual size of this process in bytes"""
+    info = psutil.Process().memory_info()
+    return {'rss': info.rss, 'vms': info.vms}
+
+tracer = MemoryTracer()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""Prometheus instrumentation for the Flask routes.
+
+Every request is counted by handler, method and status code, timed into
+a fixed-bucket latency histogram and tracked in an in-flight gauge. The
+numbers are exposed on ``/metrics`` in the Prometheus text format.
+
+Under a pre-fork server each worker writes its samples to memory-mapped
+files in PROMETHEUS_MULTIPROC_DIR and ``/metrics`` sums them, so every
+worker reports the same process-group-wide totals. The directory has to
+be known before prometheus_client is imported, so one is created here
+when a production SERVER_MODE is selected and none was configured, and
+removed again when the process that created it exits. Files left by an
+earlier run would be summed into the totals, so the server clears the
+directory before it forks its workers (see reset_multiproc_dir).
+"""
+
+import atexit
+import glob
+import os
+import shutil
+import tempfile
+import time
+
+def _remove_owned_dir(path, owner):
+    # Forked workers run atexit handlers too; only the creator removes it
+    if os.getpid() == owner:
+        shutil.rmtree(path, ignore_errors=True)
+
+if os.getenv('SERVER_MODE', 'dev') != 'dev' and not os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='prometheus-')
+    atexit.register(_remove_owned_dir, os.environ['PROMETHEUS_MULTIPROC_DIR'], os.getpid())
+
+from flask import g, request
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry,
+                               Counter, Gauge, Histogram, generate_latest, multiprocess)
+
+from runtime import runtime
+from sharedmetrics import segment
+
+MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+
+# Fixed latency buckets in seconds, tuned for sub-millisecond to second responses
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Buckets in seconds for how long streaming responses stay open
+STREAM_BUCKETS = (1, 10, 60, 300, 900, 1800, 3600, 14400)
+
+REQUESTS = Counter(
+    'http_requests_total', 'HTTP requests served',
+    ['handler', 'method', 'code'])
+LATENCY = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency',
+    ['handler'], buckets=LATENCY_BUCKETS)
+IN_FLIGHT = Gauge(
+    'http_requests_in_flight', 'HTTP requests currently being served',
+    ['handler'], multiprocess_mode='livesum')
+STREAMS_OPEN = Gauge(
+    'http_streams_open', 'Streaming responses currently open',
+    ['handler'], multiprocess_mode='livesum')
+STREAM_DURATION = Histogram(
+    'http_stream_duration_seconds', 'How long streaming responses stayed open',
+    ['handler'], buckets=STREAM_BUCKETS)
+SHED = Counter(
+    'http_requests_shed_total', 'HTTP requests rejected by admission control',
+    ['handler', 'reason'])
+ACCESS_LOG_DROPPED = Counter(
+    'access_log_dropped_total', 'Access log records dropped because the buffer was full or the write failed')
+SHARED_SKIPPED = Counter(
+    'shared_metrics_skipped_total', 'Shared metric recordings skipped because every shared metric slot was taken')
+
+# Process-group-wide totals for the JSON endpoints, kept in shared memory
+# so any worker can read them without IPC or reading the metric files
+GROUP_LATENCY = segment.histogram('http_request_duration_seconds', LATENCY_BUCKETS)
+GROUP_ERRORS = segment.counter('http_responses_5xx_total')
+GROUP_SHED = segment.counter('http_requests_shed_total')
+GROUP_IN_FLIGHT = segment.gauge('http_requests_in_flight')
+GROUP_STREAMS_OPEN = segment.gauge('http_streams_open')
+GROUP_ACCESS_LOG_DROPPED = segment.counter('access_log_dropped_total')
+# A worker without a shared slot still shows up in its own Prometheus files
+segment.on_skipped = SHARED_SKIPPED.inc
+
+# Per-worker runtime metrics are read from the shared segment as well
+if not MULTIPROC_DIR:
+    REGISTRY.register(runtime)
+
+def handler_name():
+    """Label for the current request: the view function, or not_found"""
+    return request.endpoint or 'not_found'
+
+def request_started(handler):
+    """Count a request as in flight"""
+    IN_FLIGHT.labels(handler).inc()
+    GROUP_IN_FLIGHT.inc()
+
+def request_finished(handler):
+    """Count a request as no longer in flight"""
+    IN_FLIGHT.labels(handler).dec()
+    GROUP_IN_FLIGHT.dec()
+
+def _start_timer():
+    g.metrics_handler = handler_name()
+    g.metrics_started = time.perf_counter()
+    request_started(g.metrics_handler)
+
+def observe(handler, method, status_code, elapsed):
+    """Record one finished request"""
+    LATENCY.labels(handler).observe(elapsed)
+    REQUESTS.labels(handler, method, str(status_code)).inc()
+    GROUP_LATENCY.observe(elapsed)
+    if status_code >= 500:
+        GROUP_ERRORS.inc()
+
+def stream_opened(handler):
+    """Count a streaming response as open"""
+    STREAMS_OPEN.labels(handler).inc()
+    GROUP_STREAMS_OPEN.inc()
+
+def stream_closed(handler):
+    """Count a streaming response as closed"""
+    STREAMS_OPEN.labels(handler).dec()
+    GROUP_STREAMS_OPEN.dec()
+
+def observe_stream(handler, method, status_code, elapsed):
+    """Record one finished streaming response, outside the latency histograms"""
+    STREAM_DURATION.labels(handler).observe(elapsed)
+    REQUESTS.labels(handler, method, str(status_code)).inc()
+
+def shed(handler, reason):
+    """Record a request rejected by admission control"""
+    SHED.labels(handler, reason).inc()
+    GROUP_SHED.inc()
+
+def access_log_dropped(count):
+    """Record access log records that were dropped"""
+    ACCESS_LOG_DROPPED.inc(count)
+    GROUP_ACCESS_LOG_DROPPED.inc(count)
+
+def requests_served():
+    """Requests every worker in the process group has served so far"""
+    return GROUP_LATENCY.value()['count']
+
+def bucket_quantile(buckets, count, quantile):
+    """Upper bound of the histogram bucket holding a quantile, or None"""
+    if not count:
+        return None
+    for bound, cumulative in buckets:
+        if cumulative >= quantile * count:
+            return None if bound == float('inf') else bound
+    return None
+
+def group_summary():
+    """Request totals and latency for the whole process group"""
+    snapshot = segment.snapshot()
+    latency = GROUP_LATENCY.value(snapshot)
+    to_ms = lambda value: None if value is None else round(value * 1000, 3)
+    return {
+        'workers': len(segment.workers(snapshot)),
+        'served': int(latency['count']),
+        'errors': int(GROUP_ERRORS.value(snapshot)),
+        'shed': int(GROUP_SHED.value(snapshot)),
+        'in_flight': int(GROUP_IN_FLIGHT.value(snapshot)),
+        'streams_open': int(GROUP_STREAMS_OPEN.value(snapshot)),
+        'latency_ms': {
+            'mean': to_ms(latency['sum'] / latency['count']) if latency['count'] else None,
+            'p50': to_ms(bucket_quantile(latency['buckets'], latency['count'], 0.50)),
+            'p95': to_ms(bucket_quantile(latency['buckets'], latency['count'], 0.95)),
+            'p99': to_ms(bucket_quantile(latency['buckets'], latency['count'], 0.99))
+        }
+    }
+
+def _observe(response):
+    observe(g.metrics_handler, request.method, response.status_code,
+            time.perf_counter() - g.metrics_started)
+    return response
+
+def _finish(exc):
+    handler = g.pop('metrics_handler', None)
+    if handler is not None:
+        request_finished(handler)
+
+def collect():
+    """Render all metrics in the Prometheus text exposition format"""
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(runtime)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+def reset_multiproc_dir():
+    """Delete sample files of other processes; call in the master before forking"""
+    if not MULTIPROC_DIR:
+        return
+    # Files are named <type>_<pid>.db; this process's own are already mapped
+    own = f'_{os.getpid()}.db'
+    for path in glob.glob(os.path.join(MULTIPROC_DIR, '*.db')):
+        if not path.endswith(own):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+def worker_exit(pid):
+    """Drop the live gauges of a worker process that has exited"""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
+    segment.release(pid)
+
+def init_app(app):
+    """Instrument every route of a Flask app and add the /metrics endpoint"""
+    app.before_request(_start_timer)
+    app.after_request(_observe)
+    app.teardown_request(_finish)
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        """Prometheus metrics in text exposition format"""
+        return app.response_class(collect(), content_type=CONTENT_TYPE_LATEST)
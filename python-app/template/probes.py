@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Liveness and readiness probes answered before the web framework.
+
+Orchestrators probe every pod every second, so these responses skip
+Flask routing, the request context and JSON serialization entirely. The
+bodies are preallocated byte strings with only the uptime spliced in.
+Liveness always succeeds while the process can answer. Readiness fails
+with 503 until every registered readiness check passes, e.g. while a
+background warmup is still running.
+"""
+
+import os
+
+LIVENESS_PATH = os.getenv('LIVENESS_PATH', '/livez')
+READINESS_PATH = os.getenv('READINESS_PATH', '/readyz')
+
+STATUS_LINES = {
+    200: '200 OK',
+    405: '405 Method Not Allowed',
+    503: '503 Service Unavailable'
+}
+
+class ProbeBody:
+    """A JSON body with a fixed status and the uptime spliced in"""
+
+    def __init__(self, status):
+        self.prefix = f'{{"status":"{status}","uptime":'.encode()
+
+    def render(self, uptime):
+        return b'%s%.2f}\n' % (self.prefix, uptime)
+
+ALIVE = ProbeBody('alive')
+READY = ProbeBody('ready')
+NOT_READY = ProbeBody('not ready')
+
+class Probes:
+    """Answer liveness and readiness probe paths without the application"""
+
+    def __init__(self, uptime, liveness_path=LIVENESS_PATH, readiness_path=READINESS_PATH):
+        self.uptime = uptime
+        self.paths = {liveness_path: self.liveness, readiness_path: self.readiness}
+        # Callables that must all return True for the process to be ready
+        self.readiness_checks = []
+
+    def liveness(self):
+        return 200, ALIVE.render(self.uptime())
+
+    def readiness(self):
+        if all(check() for check in self.readiness_checks):
+            return 200, READY.render(self.uptime())
+        return 503, NOT_READY.render(self.uptime())
+
+    def respond(self, path, method):
+        """Status and body for a probe path, or None for any other path"""
+        probe = self.paths.get(path)
+        if probe is None:
+            return None
+        if method not in ('GET', 'HEAD'):
+            return 405, b''
+        return probe()
+
+    def wsgi(self, application):
+        """WSGI middleware answering probes and passing everything else on"""
+        def middleware(environ, start_response):
+            answer = self.respond(environ.get('PATH_INFO', ''), environ['REQUEST_METHOD'])
+            if answer is None:
+                return application(environ, start_response)
+            status, body = answer
+            headers = [
+                ('Content-Type', 'application/json'),
+                ('Content-Length', str(len(body))),
+                ('Cache-Control', 'no-store')
+            ]
+            if status == 405:
+                headers.append(('Allow', 'GET, HEAD'))
+            start_response(STATUS_LINES[status], headers)
+            return [] if environ['REQUEST_METHOD'] == 'HEAD' else [body]
+        return middleware
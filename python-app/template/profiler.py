@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""On-demand stack sampling profiler.
+
+A profile runs on the thread that asked for it: for the requested
+window it wakes up every PROFILE_INTERVAL seconds, reads the current
+frame of every other thread with ``sys._current_frames()`` and counts
+each distinct stack. Nothing is installed or running between profiles,
+so leaving the endpoint enabled costs nothing until it is used.
+
+The result is in the collapsed-stack format read by flamegraph.pl,
+speedscope and similar tools: one line per stack, root frame first,
+frames separated by ``;`` and followed by the number of samples.
+Threads that are waiting (idle pool threads, the event loop's select)
+show up as well, ending in their wait call.
+
+The requesting thread is busy for the whole window, so profiles are
+capped below the worker TIMEOUT in the production modes, and a sync
+(``prefork``) worker, whose only thread is the one sampling, cannot be
+profiled at all.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', 0.01))
+
+def default_max_seconds():
+    """PROFILE_MAX_SECONDS, capped at 80% of the worker TIMEOUT in production modes"""
+    limit = float(os.getenv('PROFILE_MAX_SECONDS', 60))
+    timeout = float(os.getenv('TIMEOUT', 30))
+    if os.getenv('SERVER_MODE', 'dev') != 'dev' and timeout > 0:
+        limit = min(limit, 0.8 * timeout)
+    return limit
+
+PROFILE_MAX_SECONDS = default_max_seconds()
+# Sync workers have no other thread to sample while a request waits on the profile
+PROFILING_SUPPORTED = os.getenv('SERVER_MODE', 'dev') != 'prefork'
+
+class ProfilerBusy(RuntimeError):
+    """Raised when a profile is requested while another one is running"""
+
+def short_path(filename):
+    """A filename relative to the sys.path entry it was imported from"""
+    best = ''
+    for entry in sys.path:
+        if entry and filename.startswith(entry.rstrip(os.sep) + os.sep) and len(entry) > len(best):
+            best = entry
+    return filename[len(best.rstrip(os.sep)) + 1:] if best else filename
+
+class StackSampler:
+    """Sample every thread's stack, one profile at a time"""
+
+    def __init__(self, interval=PROFILE_INTERVAL, max_seconds=PROFILE_MAX_SECONDS):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        # Frame labels by code object; the ``;`` separator is not allowed inside one
+        self._labels = {}
+        self._lock = threading.Lock()
+
+    def label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_qualname} ({short_path(code.co_filename)}:{code.co_firstlineno})".replace(';', ':')
+            self._labels[code] = label
+        return label
+
+    def sample(self, counts, by_thread):
+        """Add the current stack of every other thread to counts"""
+        me = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()} if by_thread else None
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self.label(frame.f_code))
+                frame = frame.f_back
+            if by_thread:
+                stack.append(names.get(ident, f'thread-{ident}').replace(';', ':'))
+            counts[';'.join(reversed(stack))] += 1
+
+    def profile(self, seconds, by_thread=False):
+        """Sample for up to max_seconds and count the stacks seen"""
+        if not seconds > 0:
+            raise ValueError("seconds must be greater than 0")
+        seconds = min(seconds, self.max_seconds)
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running in this process")
+        try:
+            counts = Counter()
+            deadline = time.monotonic() + seconds
+            next_sample = time.monotonic()
+            while next_sample < deadline:
+                self.sample(counts, by_thread)
+                next_sample += self.interval
+                delay = next_sample - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    # Fell behind; skip the missed ticks instead of bursting
+                    next_sample = time.monotonic()
+            return counts
+        finally:
+            self._lock.release()
+
+def collapse(counts):
+    """Collapsed-stack text, heaviest stacks first"""
+    return ''.join(f"{stack} {count}\n" for stack, count in counts.most_common()).encode()
+
+sampler = StackSampler()
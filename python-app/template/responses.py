@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Pre-serialized JSON response bodies.
+
+Payloads whose contents barely change are serialized to bytes once.
+Fields that do change per request (timestamps, the greeting) are left
+as markers in the serialized text and spliced in at request time. The
+output matches Flask's ``jsonify`` byte for byte because both go through
+the same encoder in jsonprovider.py, plus a trailing newline.
+"""
+
+import hashlib
+import re
+
+import jsonprovider
+
+_FIELD_MARKER = re.compile(r'"\\u0000(\w+)\\u0000"')
+
+def dumps(obj):
+    """Serialize an object the way jsonify does outside debug mode"""
+    return jsonprovider.dumps(obj).decode() + '\n'
+
+def dumps_bytes(obj):
+    """Serialized response body bytes, without a round trip through str"""
+    return jsonprovider.dumps(obj) + b'\n'
+
+def body_etag(body):
+    """Strong entity tag for a response body"""
+    return hashlib.blake2b(body, digest_size=12).hexdigest()
+
+class JsonBodyCache:
+    """JSON body serialized once, with dynamic fields filled in per request"""
+
+    def __init__(self, payload, dynamic_fields=()):
+        marked = dict(payload)
+        for field in dynamic_fields:
+            marked[field] = f'\x00{field}\x00'
+        # re.split with a capture group alternates static text and field names
+        parts = _FIELD_MARKER.split(dumps(marked))
+        self.chunks = [part.encode() if i % 2 == 0 else part for i, part in enumerate(parts)]
+        self.fields = tuple(self.chunks[1::2])
+        # Last rendered (values, body, etag); reused while the values repeat
+        self._last = None
+        if not self.fields:
+            body = self.chunks[0]
+            self._last = ({}, body, body_etag(body))
+
+    def render(self, values):
+        """Return the body bytes and ETag for the given dynamic values"""
+        last = self._last
+        if last is not None and last[0] == values:
+            return last[1], last[2]
+
+        parts = self.chunks[:]
+        for i in range(1, len(parts), 2):
+            parts[i] = jsonprovider.dumps(values[parts[i]])
+        body = b''.join(parts)
+        etag = body_etag(body)
+        self._last = (dict(values), body, etag)
+        return body, etag
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""Runtime metrics of the application's own worker processes.
+
+Each process publishes its resident memory, split into pages shared
+with other processes and pages private to it, thread count, open file
+descriptors, context switches, CPU time and garbage collector activity
+into its slot of the shared metrics segment, so any worker can report
+every worker's footprint. Publishing runs on the system sampler thread
+after each sample, through one cached ``psutil.Process`` handle read
+under ``oneshot()``. A stats or metrics request only publishes again
+when this worker's row is older than SYSTEM_MAX_STALENESS, e.g. before
+its sampler has started.
+
+Collector pauses are timed with a ``gc.callbacks`` hook. The hook only
+updates plain counters on the process; they are copied into the shared
+segment when the process publishes, so a collection never takes a lock.
+"""
+
+import gc
+import math
+import os
+import time
+
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from sampler import SYSTEM_MAX_STALENESS, psutil
+from sharedmetrics import segment
+
+class GCTimer:
+    """Count collections and time their pauses per generation"""
+
+    def __init__(self):
+        self._reset()
+        self._started = None
+        # Counts inherited from the master would be reported twice
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self.collections = [0, 0, 0]
+        self.pause_total = [0.0, 0.0, 0.0]
+        self.pause_max = 0.0
+
+    def _callback(self, phase, info):
+        # Collections hold the GIL, so only one can be timed at a time
+        if phase == 'start':
+            self._started = time.perf_counter()
+        elif self._started is not None:
+            pause = time.perf_counter() - self._started
+            self._started = None
+            generation = info['generation']
+            self.collections[generation] += 1
+            self.pause_total[generation] += pause
+            if pause > self.pause_max:
+                self.pause_max = pause
+
+    def install(self):
+        if self._callback not in gc.callbacks:
+            gc.callbacks.append(self._callback)
+
+def memory_sharing(memory):
+    """Private, shared and proportional set sizes of this process in bytes"""
+    try:
+        # One summary of /proc/self/smaps, far cheaper than reading smaps itself
+        with open('/proc/self/smaps_rollup', 'rb') as rollup:
+            sizes = {}
+            for line in rollup:
+                name, _, value = line.partition(b':')
+                if value.endswith(b'kB\n'):
+                    sizes[name] = int(value.split()[0]) * 1024
+        return {
+            'private_bytes': sizes[b'Private_Clean'] + sizes[b'Private_Dirty'],
+            'shared_bytes': sizes[b'Shared_Clean'] + sizes[b'Shared_Dirty'],
+            'pss_bytes': sizes[b'Pss']
+        }
+    except (OSError, KeyError, ValueError):
+        # Before Linux 4.14, or not Linux: psutil's shared figure, where there is one
+        shared = getattr(memory, 'shared', 0)
+        return {'private_bytes': memory.rss - shared, 'shared_bytes': shared, 'pss_bytes': memory.rss}
+
+# Per-worker values, set rather than added, and zeroed when a worker exits
+FIELDS = (
+    'rss_bytes', 'private_bytes', 'shared_bytes', 'pss_bytes', 'threads', 'open_fds', 'cpu_user_seconds', 'cpu_system_seconds',
+    'voluntary_context_switches', 'involuntary_context_switches',
+    'gc_collections_0', 'gc_collections_1', 'gc_collections_2',
+    'gc_pause_seconds_0', 'gc_pause_seconds_1', 'gc_pause_seconds_2', 'gc_pause_max_seconds', 'gc_frozen'
+)
+
+class RuntimeCollector:
+    """Publish this process's runtime metrics and read every worker's"""
+
+    def __init__(self, segment, max_staleness=SYSTEM_MAX_STALENESS):
+        self.segment = segment
+        self.max_staleness = max_staleness
+        self.gauges = {name: segment.gauge(f'process_{name}') for name in FIELDS}
+        self.gc_timer = GCTimer()
+        self._process = None
+        self.published_at = -math.inf
+        # The master's row is not the worker's
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._forget_published)
+
+    def _forget_published(self):
+        self.published_at = -math.inf
+
+    def process(self):
+        """psutil handle for this process, replaced after a fork"""
+        process = self._process
+        if process is None or process.pid != os.getpid():
+            process = self._process = psutil.Process()
+        return process
+
+    def values(self):
+        """Current runtime metrics of this process"""
+        process = self.process()
+        with process.oneshot():
+            memory = process.memory_info()
+            cpu = process.cpu_times()
+            switches = process.num_ctx_switches()
+            threads = process.num_threads()
+            open_fds = process.num_fds() if hasattr(process, 'num_fds') else process.num_handles()
+        timer = self.gc_timer
+        values = {
+            'rss_bytes': memory.rss,
+            'threads': threads,
+            'open_fds': open_fds,
+            'cpu_user_seconds': cpu.user,
+            'cpu_system_seconds': cpu.system,
+            'voluntary_context_switches': switches.voluntary,
+            'involuntary_context_switches': switches.involuntary,
+            'gc_pause_max_seconds': timer.pause_max,
+            'gc_frozen': gc.get_freeze_count()
+        }
+        values.update(memory_sharing(memory))
+        for generation in range(3):
+            values[f'gc_collections_{generation}'] = timer.collections[generation]
+            values[f'gc_pause_seconds_{generation}'] = timer.pause_total[generation]
+        return values
+
+    def publish(self, system_info=None):
+        """Copy this process's metrics into its shared slot; a sampler listener"""
+        values = self.values()
+        self.segment.set_many((self.gauges[name].cell, values[name]) for name in FIELDS)
+        self.published_at = time.monotonic()
+
+    def stale(self):
+        """Whether this worker's published row is older than max_staleness"""
+        return time.monotonic() - self.published_at > self.max_staleness
+
+    def refresh(self):
+        """Publish again only if the sampler has not done so recently"""
+        if self.stale():
+            self.publish()
+
+    def workers(self):
+        """Runtime metrics of every live worker that has published, by pid"""
+        rows = self.segment.worker_rows()
+        return {pid: {name: gauge.of(row) for name, gauge in self.gauges.items()}
+                for pid, row in rows.items() if self.gauges['rss_bytes'].of(row)}
+
+    def summary(self):
+        """Per-worker footprint and process group totals for /api/stats"""
+        self.refresh()
+        workers = self.workers()
+        per_worker = []
+        for pid, values in sorted(workers.items()):
+            per_worker.append({
+                'pid': pid,
+                'rss_mb': round(values['rss_bytes'] / 1024 / 1024, 1),
+                'private_mb': round(values['private_bytes'] / 1024 / 1024, 1),
+                'shared_mb': round(values['shared_bytes'] / 1024 / 1024, 1),
+                'pss_mb': round(values['pss_bytes'] / 1024 / 1024, 1),
+                'threads': int(values['threads']),
+                'open_fds': int(values['open_fds']),
+                'cpu_seconds': round(values['cpu_user_seconds'] + values['cpu_system_seconds'], 3),
+                'context_switches': {
+                    'voluntary': int(values['voluntary_context_switches']),
+                    'involuntary': int(values['involuntary_context_switches'])
+                },
+                'gc': {
+                    'collections': [int(values[f'gc_collections_{generation}']) for generation in range(3)],
+                    'pause_ms': [round(values[f'gc_pause_seconds_{generation}'] * 1000, 3) for generation in range(3)],
+                    'max_pause_ms': round(values['gc_pause_max_seconds'] * 1000, 3),
+                    'frozen': int(values['gc_frozen'])
+                }
+            })
+        return {
+            'workers': per_worker,
+            'total': {
+                'rss_mb': round(sum(worker['rss_mb'] for worker in per_worker), 1),
+                # What the workers really cost: shared pages counted once between them
+                'pss_mb': round(sum(worker['pss_mb'] for worker in per_worker), 1),
+                'private_mb': round(sum(worker['private_mb'] for worker in per_worker), 1),
+                'threads': sum(worker['threads'] for worker in per_worker),
+                'open_fds': sum(worker['open_fds'] for worker in per_worker),
+                'cpu_seconds': round(sum(worker['cpu_seconds'] for worker in per_worker), 3),
+                'gc_collections': sum(sum(worker['gc']['collections']) for worker in per_worker),
+                'gc_pause_ms': round(sum(sum(worker['gc']['pause_ms']) for worker in per_worker), 3)
+            }
+        }
+
+    @staticmethod
+    def _families():
+        return {
+            'rss': GaugeMetricFamily('worker_resident_memory_bytes', 'Resident memory of each worker', labels=['pid']),
+            'sharing': GaugeMetricFamily('worker_memory_bytes',
+                                         'Resident memory of each worker by whether it is shared with other processes',
+                                         labels=['pid', 'kind']),
+            'threads': GaugeMetricFamily('worker_threads', 'Threads in each worker', labels=['pid']),
+            'fds': GaugeMetricFamily('worker_open_fds', 'Open file descriptors of each worker', labels=['pid']),
+            'cpu': CounterMetricFamily('worker_cpu_seconds', 'CPU time of each worker', labels=['pid', 'mode']),
+            'switches': CounterMetricFamily('worker_context_switches', 'Context switches of each worker',
+                                            labels=['pid', 'kind']),
+            'collections': CounterMetricFamily('worker_gc_collections', 'Garbage collections in each worker',
+                                               labels=['pid', 'generation']),
+            'pauses': CounterMetricFamily('worker_gc_pause_seconds',
+                                          'Time each worker spent paused in garbage collection',
+                                          labels=['pid', 'generation']),
+            'max_pause': GaugeMetricFamily('worker_gc_pause_max_seconds',
+                                           'Longest garbage collection pause of each worker', labels=['pid'])
+        }
+
+    def describe(self):
+        """prometheus_client hook: the metric names, without collecting anything"""
+        return list(self._families().values())
+
+    def collect(self):
+        """prometheus_client collector: one sample per worker, labelled by pid"""
+        self.refresh()
+        families = self._families()
+        for pid, values in self.workers().items():
+            pid = str(pid)
+            families['rss'].add_metric([pid], values['rss_bytes'])
+            for kind in ('private', 'shared', 'pss'):
+                families['sharing'].add_metric([pid, kind], values[f'{kind}_bytes'])
+            families['threads'].add_metric([pid], values['threads'])
+            families['fds'].add_metric([pid], values['open_fds'])
+            families['cpu'].add_metric([pid, 'user'], values['cpu_user_seconds'])
+            families['cpu'].add_metric([pid, 'system'], values['cpu_system_seconds'])
+            families['switches'].add_metric([pid, 'voluntary'], values['voluntary_context_switches'])
+            families['switches'].add_metric([pid, 'involuntary'], values['involuntary_context_switches'])
+            for generation in range(3):
+                families['collections'].add_metric([pid, str(generation)], values[f'gc_collections_{generation}'])
+                families['pauses'].add_metric([pid, str(generation)], values[f'gc_pause_seconds_{generation}'])
+            families['max_pause'].add_metric([pid], values['gc_pause_max_seconds'])
+        return list(families.values())
+
+runtime = RuntimeCollector(segment)
+runtime.gc_timer.install()
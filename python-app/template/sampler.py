@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Background sampling of system metrics.
+
+A daemon thread refreshes a snapshot of the system metrics at a fixed
+interval. The snapshot is an immutable-by-convention dict that is
+replaced wholesale on every refresh, so request handlers can read it
+without taking a lock. Handlers that find it too stale share a single
+collection rather than each calling psutil (see singleflight.py).
+Platform details never change for the life of the process and are
+computed once at import from ``os.uname`` rather than the
+slower-to-import ``platform`` module. psutil is imported on
+first use (see startup.py).
+"""
+
+import os
+import sys
+import time
+
+from cgroup import CgroupCollector
+from singleflight import SingleFlight
+from startup import LazyModule
+from workerthread import WorkerThread
+
+psutil = LazyModule('psutil')
+
+if hasattr(os, 'uname'):
+    _system, _machine = os.uname().sysname, os.uname().machine
+else:
+    # Windows has no os.uname
+    import platform
+    _system, _machine = platform.system(), platform.machine()
+
+PLATFORM_INFO = {
+    'python_version': sys.version.split()[0],
+    'platform': _system,
+    'architecture': _machine
+}
+
+UNAVAILABLE_MEMORY = {
+    'total': 'N/A',
+    'available': 'N/A',
+    'percent': 'N/A'
+}
+
+def read_memory_usage():
+    """Read host memory usage from psutil"""
+    try:
+        memory = psutil.virtual_memory()
+        return {
+            'total': memory.total,
+            'available': memory.available,
+            'percent': memory.percent
+        }
+    except Exception:
+        return UNAVAILABLE_MEMORY
+
+container_collector = CgroupCollector()
+
+def read_container_usage():
+    """Read the container's own cgroup resource metrics"""
+    try:
+        return container_collector.collect()
+    except Exception:
+        return None
+
+def collect_system_info():
+    """Build a full system information snapshot"""
+    info = dict(PLATFORM_INFO)
+    info['memory_usage'] = read_memory_usage()
+    info['container'] = read_container_usage()
+    return info
+
+class SystemSampler(WorkerThread):
+    """Share one system information snapshot between all request handlers
+
+    A background thread refreshes the snapshot every interval. A request
+    that finds it older than max_staleness (the thread has fallen behind,
+    or the interval is 0 and there is no thread) refreshes it itself, and
+    concurrent requests are coalesced onto that single collection.
+    """
+
+    thread_name = 'system-sampler'
+
+    def __init__(self, interval, max_staleness):
+        self.interval = interval
+        self.flight = SingleFlight(self._sample, max_staleness)
+        # Callables invoked with every new snapshot, on whichever thread took it
+        self.listeners = []
+        super().__init__()
+
+    @property
+    def snapshot(self):
+        return self.flight.value
+
+    @property
+    def sampled_at(self):
+        return self.flight.computed_at
+
+    def _sample(self):
+        snapshot = collect_system_info()
+        for listener in self.listeners:
+            try:
+                listener(snapshot)
+            except Exception:
+                # A failing listener must not stop the sampler
+                pass
+        return snapshot
+
+    def refresh(self):
+        """Take a new sample, or join one that is already being taken"""
+        return self.flight.get(max_staleness=0)
+
+    def start(self):
+        """Start the sampling thread unless the interval is 0"""
+        if self.interval:
+            super().start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.refresh()
+
+    def get(self):
+        """The latest snapshot, starting the sampler on first use"""
+        if self.interval and not self.running:
+            self.start()
+        return self.flight.get()
+
+    async def get_async(self):
+        """The latest snapshot, sampling off the event loop when it is stale"""
+        if self.interval and not self.running:
+            self.start()
+        return await self.flight.get_async()
+
+SYSTEM_SAMPLE_INTERVAL = float(os.getenv('SYSTEM_SAMPLE_INTERVAL', 1.0))
+SYSTEM_MAX_STALENESS = float(os.getenv('SYSTEM_MAX_STALENESS', 2 * SYSTEM_SAMPLE_INTERVAL or 1.0))
+system_sampler = SystemSampler(SYSTEM_SAMPLE_INTERVAL, SYSTEM_MAX_STALENESS)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""Production serving modes for the dashboard application.
+
+The mode is chosen with the SERVER_MODE environment variable:
+
+- dev:      Werkzeug development server (``app.run``)
+- prefork:  pre-fork pool of synchronous worker processes
+- threaded: pre-fork pool of worker processes, each with a thread pool
+- async:    pre-fork pool of event-loop (uvicorn) worker processes serving
+            the native ASGI application from asgi.py
+
+All production modes run under gunicorn's arbiter, which binds the
+listening socket once in the master and forks the workers from it. Under
+supervisor.py the socket is inherited from the supervisor instead, and
+the server reports back once its workers are ready.
+
+With PRELOAD (the default) the master builds everything the workers
+would otherwise build for themselves before it forks them: the deferred
+pages, template and modules, whatever STARTUP_MODE says, and Flask's
+URL matcher. It then collects garbage once and freezes every surviving
+object out of the collector, so collections in the workers never touch,
+and so never unshare, the pages inherited from the master. Workers get
+GC_THRESHOLD, since fewer gen-0 collections mean fewer pauses.
+"""
+
+import gc
+import os
+
+from gunicorn.app.base import BaseApplication
+
+import metrics
+from cgroup import available_cpus
+from sharedmetrics import segment
+from startup import startup
+
+SERVER_MODES = ('dev', 'prefork', 'threaded', 'async')
+
+# gunicorn worker class used for each production mode
+WORKER_CLASSES = {
+    'prefork': 'sync',
+    'threaded': 'gthread',
+    'async': 'uvicorn.workers.UvicornWorker'
+}
+
+def env_int(name, default):
+    """Read an integer setting from the environment"""
+    return int(os.getenv(name, default))
+
+def env_flag(name, default):
+    """Read a 0/1 setting from the environment"""
+    return os.getenv(name, default) == '1'
+
+def gc_threshold():
+    """Worker collector thresholds from GC_THRESHOLD, e.g. ``50000,20,20``"""
+    return tuple(int(value) for value in os.getenv('GC_THRESHOLD', '50000,20,20').split(','))
+
+def default_workers():
+    """One worker per CPU the container's quota allows, leaving the master a shared metric slot"""
+    return max(1, min(available_cpus(), segment.slots - 1))
+
+def child_exit(server, worker):
+    """gunicorn hook: clean up after a worker process has exited"""
+    metrics.worker_exit(worker.pid)
+
+def notify_supervisor(message):
+    """Report start-up progress to supervisor.py, if it started this server"""
+    ready_fd = os.getenv('SUPERVISOR_READY_FD')
+    if ready_fd:
+        try:
+            os.write(int(ready_fd), message)
+        except OSError:
+            # The supervisor has stopped listening, e.g. after a timeout
+            pass
+
+def when_ready(server):
+    """gunicorn hook: tell the supervisor how many workers to wait for"""
+    notify_supervisor(f"{server.cfg.workers}\n".encode())
+
+def post_worker_init(worker):
+    """gunicorn hook: tell the supervisor a worker is ready to serve"""
+    notify_supervisor(b'.')
+
+def pre_fork(server, worker):
+    """gunicorn hook: freeze what the master has created since the last fork"""
+    gc.freeze()
+
+def post_fork(server, worker):
+    """gunicorn hook: tune the new worker's collector"""
+    gc.set_threshold(*gc_threshold())
+
+def preload():
+    """Build everything in the master so the workers share it copy-on-write"""
+    from app import app
+    startup.warm()
+    app.url_map.update()
+    # Garbage freed after the fork would leave holes the workers fill, unsharing pages
+    gc.collect()
+    gc.freeze()
+
+def bind_address(port):
+    """The listening socket inherited from supervisor.py, or the port to bind"""
+    listen_fd = os.getenv('SUPERVISOR_LISTEN_FD')
+    return f"fd://{listen_fd}" if listen_fd else f"0.0.0.0:{port}"
+
+def server_options(mode, port):
+    """Build gunicorn settings for a serving mode from the environment"""
+    options = {
+        'bind': bind_address(port),
+        'worker_class': WORKER_CLASSES[mode],
+        'workers': env_int('WEB_CONCURRENCY', default_workers()),
+        'threads': env_int('THREADS', 8) if mode == 'threaded' else 1,
+        'worker_connections': env_int('WORKER_CONNECTIONS', 1000),
+        'backlog': env_int('BACKLOG', 2048),
+        'keepalive': env_int('KEEPALIVE', 5),
+        'timeout': env_int('TIMEOUT', 30),
+        'graceful_timeout': env_int('GRACEFUL_TIMEOUT', 30),
+        'errorlog': '-',
+        'loglevel': os.getenv('LOG_LEVEL', 'info'),
+        'child_exit': child_exit,
+        'when_ready': when_ready,
+        'post_worker_init': post_worker_init
+    }
+    if env_flag('PRELOAD', '1'):
+        options.update(pre_fork=pre_fork, post_fork=post_fork)
+    return options
+
+class ProductionServer(BaseApplication):
+    """Run an already imported application object under gunicorn"""
+
+    def __init__(self, application, options):
+        self.application = application
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
+
+def load_application(mode):
+    """The WSGI application, or the native ASGI application for async mode"""
+    if mode == 'async':
+        from asgi import application
+        return application
+    from app import app
+    return app
+
+def serve(mode, port):
+    """Serve the dashboard in the given production mode"""
+    if mode not in WORKER_CLASSES:
+        raise ValueError(f"Unknown SERVER_MODE '{mode}', expected one of {', '.join(SERVER_MODES)}")
+
+    application = load_application(mode)
+    options = server_options(mode, port)
+    metrics.reset_multiproc_dir()
+    if env_flag('PRELOAD', '1'):
+        preload()
+    ProductionServer(application, options).run()
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""Process-group-wide counters in a shared memory segment.
+
+The segment is a memory-mapped file created before the workers are
+forked, so every worker maps the same pages. It holds the master's start
+time and one slot per worker process. A worker only ever writes to its
+own slot, so recording a request is an in-place float update guarded by
+a process-local lock: no IPC and no cross-process locking. Readers sum
+the slots of every worker that has ever run, so counters survive worker
+restarts, while gauges are zeroed when a worker's slot is released or
+reused. A snapshot is one copy of the mapped pages.
+
+Without SHARED_METRICS_PATH the backing file is an unlinked temporary
+file, which works whenever the application is imported before the fork
+(as ``python app.py`` does). Set it to a path to share the segment
+between processes that import the application independently.
+
+A process that finds every slot taken does not fail: it logs once, skips
+its recordings and counts them through ``on_skipped``.
+"""
+
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+
+from cgroup import available_cpus
+
+try:
+    import fcntl
+except ImportError:
+    # No cross-process workers to coordinate without fork
+    fcntl = None
+
+MAGIC = b'SHMETR01'
+# magic, started (monotonic), started (epoch seconds)
+HEADER = struct.Struct('<8sdd')
+HEADER_SIZE = 64
+
+class SharedCounter:
+    """Monotonic total summed across all workers"""
+
+    def __init__(self, segment, name):
+        self.name = name
+        self.segment = segment
+        self.cell = segment.allocate(1)
+
+    def inc(self, amount=1):
+        self.segment.add(self.cell, amount)
+
+    def value(self, snapshot=None):
+        return (snapshot or self.segment.snapshot()).total(self.cell)
+
+class SharedGauge(SharedCounter):
+    """Current value summed across live workers, zeroed when a worker goes"""
+
+    def __init__(self, segment, name):
+        self.name = name
+        self.segment = segment
+        self.cell = segment.allocate(1, gauge=True)
+
+    def dec(self, amount=1):
+        self.segment.add(self.cell, -amount)
+
+    def set(self, value):
+        self.segment.set_many(((self.cell, value),))
+
+    def of(self, row):
+        """This gauge's value in one worker's row from worker_rows()"""
+        return row[self.cell]
+
+class SharedHistogram:
+    """Fixed-bucket histogram summed across all workers"""
+
+    def __init__(self, segment, name, buckets):
+        self.name = name
+        self.segment = segment
+        self.buckets = tuple(buckets) + (float('inf'),)
+        # One cell per bucket, then the sum of observations
+        self.cell = segment.allocate(len(self.buckets) + 1)
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        self.segment.add_many(((self.cell + i, 1), (self.cell + len(self.buckets), value)))
+
+    def value(self, snapshot=None):
+        """Cumulative bucket counts, total count and sum"""
+        snapshot = snapshot or self.segment.snapshot()
+        counts = [snapshot.total(self.cell + i) for i in range(len(self.buckets))]
+        cumulative, running = [], 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return {
+            'buckets': list(zip(self.buckets, cumulative)),
+            'count': running,
+            'sum': snapshot.total(self.cell + len(self.buckets))
+        }
+
+class Snapshot:
+    """A point-in-time copy of every worker slot"""
+
+    def __init__(self, cells, slot_cells, slots):
+        self.rows = [cells[i * slot_cells:(i + 1) * slot_cells] for i in range(slots)
+                     if cells[i * slot_cells]]
+
+    def total(self, cell):
+        return sum(row[cell] for row in self.rows)
+
+class SharedSegment:
+    """A shared mapping with one slot of float cells per worker process"""
+
+    def __init__(self, path=None, slots=64, slot_cells=128):
+        self.slots = slots
+        self.slot_cells = slot_cells
+        size = HEADER_SIZE + slots * slot_cells * 8
+        if path:
+            self._file = open(path, 'a+b')
+        else:
+            self._file = tempfile.TemporaryFile(prefix='shared-metrics-')
+        self._fd = self._file.fileno()
+
+        with self._exclusive():
+            if os.fstat(self._fd).st_size < size:
+                os.ftruncate(self._fd, size)
+            self._map = mmap.mmap(self._fd, size)
+            self.cells = memoryview(self._map)[HEADER_SIZE:].cast('d')
+            magic, self.started, self.started_wall = HEADER.unpack_from(self._map)
+            owners = [int(self.cells[slot * slot_cells]) for slot in range(slots)]
+            # A file left behind by an earlier run starts over
+            if magic != MAGIC or not any(owner and self._alive(owner) for owner in owners):
+                self._map[:] = bytes(size)
+                self.started, self.started_wall = time.monotonic(), time.time()
+                HEADER.pack_into(self._map, 0, MAGIC, self.started, self.started_wall)
+
+        # Cell 0 of every slot holds the owning pid; metrics start at 1
+        self._next_cell = 1
+        self._gauge_cells = []
+        self._slot = None
+        self._full = False
+        self._lock = threading.Lock()
+        # Called with no arguments for each recording skipped for want of a slot
+        self.on_skipped = None
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._forget_slot)
+
+    def _forget_slot(self):
+        self._slot = None
+        self._full = False
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _exclusive(self):
+        """Hold the cross-process lock on the backing file; only taken to claim a slot"""
+        if fcntl:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+    def allocate(self, count, gauge=False):
+        """Reserve cells in every slot for a new metric"""
+        cell = self._next_cell
+        if cell + count > self.slot_cells:
+            raise ValueError(f"Shared metrics need more than {self.slot_cells} cells per slot")
+        self._next_cell += count
+        if gauge:
+            self._gauge_cells.extend(range(cell, cell + count))
+        return cell
+
+    def counter(self, name):
+        return SharedCounter(self, name)
+
+    def gauge(self, name):
+        return SharedGauge(self, name)
+
+    def histogram(self, name, buckets):
+        return SharedHistogram(self, name, buckets)
+
+    @staticmethod
+    def _alive(pid):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def _claim(self):
+        """Take a free slot, or one left behind by a worker that has died"""
+        pid = os.getpid()
+        with self._exclusive():
+            for slot in range(self.slots):
+                base = slot * self.slot_cells
+                owner = int(self.cells[base])
+                if owner == 0 or owner == pid or not self._alive(owner):
+                    # Counters carry on from the previous owner; gauges do not
+                    for cell in self._gauge_cells:
+                        self.cells[base + cell] = 0.0
+                    self.cells[base] = pid
+                    self._slot = base
+                    return base
+        # Metrics must not fail requests; this process records nothing instead.
+        # It does not try again later, since a gauge raised before the slot
+        # was claimed would then be lowered without ever having been raised.
+        self._full = True
+        print(f"[shared metrics {pid}] All {self.slots} slots are in use; this process's "
+              f"requests are not recorded (raise SHARED_METRICS_SLOTS)", file=sys.stderr, flush=True)
+        return None
+
+    def _own_slot(self):
+        """Base cell of this process's slot, or None if no slot was free"""
+        if self._slot is None and not self._full:
+            self._claim()
+        if self._slot is None and self.on_skipped:
+            self.on_skipped()
+        return self._slot
+
+    def add(self, cell, amount):
+        with self._lock:
+            base = self._own_slot()
+            if base is not None:
+                self.cells[base + cell] += amount
+
+    def add_many(self, updates):
+        with self._lock:
+            base = self._own_slot()
+            if base is not None:
+                for cell, amount in updates:
+                    self.cells[base + cell] += amount
+
+    def set_many(self, updates):
+        with self._lock:
+            base = self._own_slot()
+            if base is not None:
+                for cell, value in updates:
+                    self.cells[base + cell] = value
+
+    def release(self, pid):
+        """Zero the gauges of a worker that has exited"""
+        for slot in range(self.slots):
+            base = slot * self.slot_cells
+            if int(self.cells[base]) == pid:
+                for cell in self._gauge_cells:
+                    self.cells[base + cell] = 0.0
+
+    def snapshot(self):
+        """Copy every slot out of the mapping in one go"""
+        cells = array('d')
+        cells.frombytes(self._map[HEADER_SIZE:])
+        return Snapshot(cells, self.slot_cells, self.slots)
+
+    def worker_rows(self, snapshot=None):
+        """Slot rows of the live processes that own a slot, by pid"""
+        snapshot = snapshot or self.snapshot()
+        return {int(row[0]): row for row in snapshot.rows if self._alive(int(row[0]))}
+
+    def workers(self, snapshot=None):
+        """Pids of the live processes that own a slot"""
+        return list(self.worker_rows(snapshot))
+
+def default_slots():
+    """Twice the configured workers plus one for the master
+
+    The spare slots cover workers that are replaced (max_requests, crashes,
+    reloads) while the slots of the ones they replace are still held.
+    """
+    workers = int(os.getenv('WEB_CONCURRENCY') or 0) or available_cpus()
+    return 2 * workers + 1
+
+segment = SharedSegment(os.getenv('SHARED_METRICS_PATH'),
+                        slots=int(os.getenv('SHARED_METRICS_SLOTS') or default_slots()))
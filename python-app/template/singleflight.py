@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Single-flight coalescing of an expensive computation.
+
+Callers that want a result no older than a maximum staleness get the
+cached one. When it is too old, the first caller computes a new one and
+everyone who arrives while that is in flight waits for the same result
+instead of starting another computation. Waiters can be threads, which
+block on an event, or asyncio tasks, which await a future resolved on
+their own event loop, and the computation itself can be started by
+either.
+"""
+
+import asyncio
+import math
+import os
+import threading
+import time
+
+class _Call:
+    """One in-flight computation and the callers waiting on it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        # (loop, future) pairs of waiting asyncio tasks
+        self.loop_waiters = []
+
+    def result(self):
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+class SingleFlight:
+    """Cache a computation's result and coalesce concurrent refreshes"""
+
+    def __init__(self, compute, max_staleness):
+        self.compute = compute
+        self.max_staleness = max_staleness
+        self.value = None
+        self.computed_at = -math.inf
+        self._call = None
+        self._lock = threading.Lock()
+        # An in-flight call belongs to a thread that does not survive fork
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._forget_call)
+
+    def _forget_call(self):
+        self._call = None
+        self._lock = threading.Lock()
+
+    def _fresh(self, max_staleness):
+        if max_staleness is None:
+            max_staleness = self.max_staleness
+        return time.monotonic() - self.computed_at <= max_staleness
+
+    def _join(self):
+        """The in-flight call and whether this caller has to run it"""
+        call = self._call
+        if call is None:
+            call = self._call = _Call()
+            return call, True
+        return call, False
+
+    def _run(self, call):
+        try:
+            call.value = self.compute()
+            self.value = call.value
+            self.computed_at = time.monotonic()
+        except Exception as error:
+            call.error = error
+        finally:
+            with self._lock:
+                self._call = None
+                loop_waiters = call.loop_waiters
+            call.done.set()
+            for loop, future in loop_waiters:
+                try:
+                    loop.call_soon_threadsafe(self._resolve, future)
+                except RuntimeError:
+                    # The loop has been closed
+                    pass
+
+    @staticmethod
+    def _resolve(future):
+        if not future.done():
+            future.set_result(None)
+
+    def get(self, max_staleness=None):
+        """A result no older than max_staleness, blocking the calling thread"""
+        if self._fresh(max_staleness):
+            return self.value
+        with self._lock:
+            if self._fresh(max_staleness):
+                return self.value
+            call, leader = self._join()
+        if leader:
+            self._run(call)
+        else:
+            call.done.wait()
+        return call.result()
+
+    async def get_async(self, max_staleness=None):
+        """A result no older than max_staleness, computed off the event loop"""
+        if self._fresh(max_staleness):
+            return self.value
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._fresh(max_staleness):
+                return self.value
+            call, leader = self._join()
+            if not leader:
+                future = loop.create_future()
+                call.loop_waiters.append((loop, future))
+        if leader:
+            await loop.run_in_executor(None, self._run, call)
+        else:
+            await future
+        return call.result()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Startup mode and cold-start timing.
+
+Expensive one-off work (importing psutil, compiling the dashboard
+template, precompressing pages and assets) is wrapped in ``Deferred``
+values. STARTUP_MODE decides when they are built:
+
+- ``eager``: all of them, before the module finishes importing
+- ``lazy``: each one on first use
+- ``background``: on a warmup thread started once the module is imported
+
+The clock starts when this module is imported, which app.py does before
+anything else, and stops at the first response, so the reported time to
+first byte covers every import and whatever warmup the request waited on.
+"""
+
+import os
+import sys
+import threading
+import time
+
+IMPORT_STARTED = time.perf_counter()
+
+STARTUP_MODES = ('eager', 'lazy', 'background')
+STARTUP_MODE = os.getenv('STARTUP_MODE', 'eager')
+
+_UNSET = object()
+# One lock for every build, re-entrant because pages build the template
+_build_lock = threading.RLock()
+_deferred = []
+
+def _reset_lock():
+    global _build_lock
+    # A warmup thread may hold the lock at fork; it does not exist in the child
+    _build_lock = threading.RLock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_lock)
+
+class Deferred:
+    """A value built on first use, at most once across threads"""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._value = _UNSET
+        _deferred.append(self)
+
+    @property
+    def ready(self):
+        return self._value is not _UNSET
+
+    def get(self):
+        value = self._value
+        if value is _UNSET:
+            with _build_lock:
+                if self._value is _UNSET:
+                    self._value = self.factory()
+                value = self._value
+        return value
+
+class LazyModule(Deferred):
+    """A module imported on first attribute access"""
+
+    def __init__(self, name):
+        super().__init__(lambda: __import__(name))
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+class StartupTimer:
+    """Import and time-to-first-byte measurements for this process"""
+
+    def __init__(self):
+        self.imported = None
+        self.warmed = None
+        self.first_byte = None
+
+    def warm(self):
+        """Build every deferred value that is not built yet"""
+        for deferred in list(_deferred):
+            deferred.get()
+        if self.warmed is None:
+            self.warmed = time.perf_counter() - IMPORT_STARTED
+
+    def finish_import(self):
+        """Mark the application as imported and warm it up as configured"""
+        if STARTUP_MODE not in STARTUP_MODES:
+            raise ValueError(f"Unknown STARTUP_MODE {STARTUP_MODE!r}, expected one of {', '.join(STARTUP_MODES)}")
+        if STARTUP_MODE == 'eager':
+            self.warm()
+        elif STARTUP_MODE == 'background':
+            self._start_warmup()
+            # Forked workers lose the thread; finish whatever it had left
+            if hasattr(os, 'register_at_fork'):
+                os.register_at_fork(after_in_child=self._start_warmup)
+        self.imported = time.perf_counter() - IMPORT_STARTED
+
+    def _start_warmup(self):
+        if self.warmed is None:
+            threading.Thread(target=self.warm, name='startup-warmup', daemon=True).start()
+
+    def ready(self):
+        """Whether the configured warmup has finished"""
+        return STARTUP_MODE != 'background' or self.warmed is not None
+
+    def record_first_byte(self):
+        """Mark the first response and report the cold start, once"""
+        if self.first_byte is not None:
+            return
+        self.first_byte = time.perf_counter() - IMPORT_STARTED
+        print(f"Started in {STARTUP_MODE} mode (pid {os.getpid()}): imported in {self.imported:.3f}s, "
+              f"first byte after {self.first_byte:.3f}s", file=sys.stderr, flush=True)
+
+    def report(self):
+        """Startup timings in seconds since import began"""
+        return {
+            'mode': STARTUP_MODE,
+            'import_seconds': round(self.imported, 4) if self.imported is not None else None,
+            'warmup_seconds': round(self.warmed, 4) if self.warmed is not None else None,
+            'first_byte_seconds': round(self.first_byte, 4) if self.first_byte is not None else None
+        }
+
+startup = StartupTimer()
@@ -0,0 +1,94 @@
+function changeTheme(theme) {
+    const button = document.querySelector('.theme-btn[data-theme="' + theme + '"]');
+    if (!button) {
+        window.location.href = '/?theme=' + theme;
+        return;
+    }
+
+    // Update active theme button
+    document.querySelectorAll('.theme-btn').forEach(btn => {
+        btn.classList.remove('active');
+    });
+    button.classList.add('active');
+
+    // Swap in the theme's cached stylesheet instead of reloading the page
+    document.getElementById('theme-stylesheet').href = button.dataset.stylesheet;
+    document.getElementById('theme-name').textContent = button.title.replace(' Theme', '');
+    history.replaceState(null, '', '/?theme=' + theme);
+}
+
+// Add scroll animations
+const observerOptions = {
+    threshold: 0.1,
+    rootMargin: '0px 0px -50px 0px'
+};
+
+const observer = new IntersectionObserver(function(entries) {
+    entries.forEach(entry => {
+        if (entry.isIntersecting) {
+            entry.target.style.opacity = '1';
+            entry.target.style.transform = 'translateY(0)';
+        }
+    });
+}, observerOptions);
+
+// Observe all cards for animations
+document.querySelectorAll('.dashboard-card, .api-card, .gallery-item').forEach(card => {
+    card.style.opacity = '0';
+    card.style.transform = 'translateY(30px)';
+    card.style.transition = 'opacity 0.6s ease, transform 0.6s ease';
+    observer.observe(card);
+});
+
+// Add floating animation to cards
+document.querySelectorAll('.dashboard-card').forEach((card, index) => {
+    card.style.animationDelay = `${index * 0.2}s`;
+    card.classList.add('fade-in');
+});
+
+// Update theme button states on page load
+document.addEventListener('DOMContentLoaded', function() {
+    const urlParams = new URLSearchParams(window.location.search);
+    const currentTheme = urlParams.get('theme') || 'aurora';
+
+    // Remove active class from all buttons
+    document.querySelectorAll('.theme-btn').forEach(btn => {
+        btn.classList.remove('active');
+    });
+
+    // Add active class to current theme button
+    const themeButtons = document.querySelectorAll('.theme-btn');
+    const themes = ['aurora', 'sunset', 'ocean', 'forest', 'cosmic', 'cherry'];
+    const themeIndex = themes.indexOf(currentTheme);
+    if (themeIndex >= 0 && themeButtons[themeIndex]) {
+        themeButtons[themeIndex].classList.add('active');
+    }
+});
+
+// Live metrics: pushed by the server in async mode, polled otherwise
+const statsSource = document.currentScript ? document.currentScript.dataset.statsSource : 'poll';
+
+function showStats(time, memoryPercent, uptime) {
+    document.getElementById('metric-time').textContent = time;
+    document.getElementById('metric-memory').textContent = memoryPercent + '%';
+    document.getElementById('metric-uptime').textContent = uptime + 's';
+}
+
+if (statsSource === 'stream' && window.EventSource) {
+    const stats = new EventSource('/api/stats/stream');
+    stats.addEventListener('stats', function(event) {
+        const data = JSON.parse(event.data);
+        showStats(data.time, data.memory_percent, data.uptime);
+    });
+} else {
+    setInterval(function() {
+        if (document.hidden) {
+            return;
+        }
+        fetch('/api/stats')
+            .then(response => response.json())
+            .then(data => showStats(data.timestamp.split('T')[1],
+                                    data.memory_usage.percent, Math.round(data.uptime * 10) / 10))
+            .catch(() => {});
+    }, 5000);
+}
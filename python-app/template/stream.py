@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Server-Sent Events broadcast from a single shared producer.
+
+One producer thread per process builds each event once per tick and
+serializes it to bytes. Every subscriber receives that same bytes
+object, so the per-client cost is a wakeup and a socket write.
+
+Subscribers are event-loop (ASGI) coroutines waiting on futures; a
+WSGI subscriber would hold a worker thread for as long as the page is
+open, so the Flask app does not stream. The producer wakes each event
+loop with a single thread-safe callback per tick, no matter how many
+clients that loop is holding.
+"""
+
+import asyncio
+import threading
+import time
+
+from workerthread import WorkerThread
+
+def format_event(event, data, event_id=None):
+    """Serialize one SSE message"""
+    lines = [f'event: {event}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.extend(f'data: {line}' for line in data.split('\n'))
+    return ('\n'.join(lines) + '\n\n').encode()
+
+class EventBroadcaster(WorkerThread):
+    """Publish one pre-serialized event per tick to every subscriber"""
+
+    thread_name = 'event-broadcaster'
+
+    def __init__(self, build_event, interval, retry_ms=3000):
+        self.build_event = build_event
+        self.interval = interval
+        self.preamble = f'retry: {retry_ms}\n\n'.encode()
+        # (sequence number, event bytes), swapped atomically
+        self.latest = (0, b'')
+        self._loop_waiters = {}
+        self._waiters_lock = threading.Lock()
+        super().__init__()
+
+    def _after_fork(self):
+        self._waiters_lock = threading.Lock()
+        self._loop_waiters = {}
+
+    def _prepare(self):
+        # Subscribers that arrive before the first tick get an event at once
+        self.publish(self.build_event())
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.publish(self.build_event())
+
+    def publish(self, payload):
+        """Make a new event current and wake every subscriber"""
+        latest = (self.latest[0] + 1, payload)
+        self.latest = latest
+        with self._waiters_lock:
+            loop_waiters, self._loop_waiters = self._loop_waiters, {}
+        for loop, futures in loop_waiters.items():
+            try:
+                loop.call_soon_threadsafe(self._resolve, futures, latest)
+            except RuntimeError:
+                # The loop has been closed
+                pass
+
+    @staticmethod
+    def _resolve(futures, latest):
+        for future in futures:
+            if not future.done():
+                future.set_result(latest)
+
+    async def wait_async(self, last_seq):
+        """Wait on the running event loop for an event newer than last_seq"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        # publish() swaps in the new event before taking the waiters under
+        # this lock, so re-checking here cannot miss a tick
+        with self._waiters_lock:
+            latest = self.latest
+            if latest[0] != last_seq:
+                return latest
+            self._loop_waiters.setdefault(loop, []).append(future)
+        return await future
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""Reloads with minimal disruption for the production serving modes.
+
+``python supervisor.py`` binds the listening socket once and runs the
+server (``python app.py``) as a child process that inherits it. On
+SIGHUP it starts a new generation of the server, which imports the
+application afresh, and waits until every one of its workers has booted.
+Only then is the old generation sent SIGTERM, so it stops accepting and
+drains its in-flight requests within GRACEFUL_TIMEOUT. The socket never
+closes, so connections queue in the backlog instead of being refused.
+The drain is best-effort: a client that reuses a keep-alive connection
+just as an old worker closes it sees a reset, and requests still running
+at GRACEFUL_TIMEOUT are cut off.
+If the new generation fails to come up, it is stopped and the old one
+keeps serving.
+
+SIGTERM and SIGINT stop the current generation gracefully and exit. A
+generation that dies on its own is replaced.
+"""
+
+import os
+import select
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def log(message):
+    print(f"[supervisor {os.getpid()}] {message}", file=sys.stderr, flush=True)
+
+def listen(port, backlog):
+    """Bind the listening socket that every generation inherits"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(('0.0.0.0', port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+class Generation:
+    """One ``python app.py`` server process and its readiness pipe"""
+
+    def __init__(self, listen_fd):
+        ready_read, ready_write = os.pipe()
+        env = dict(os.environ, SUPERVISOR_LISTEN_FD=str(listen_fd), SUPERVISOR_READY_FD=str(ready_write))
+        self.process = subprocess.Popen([sys.executable, 'app.py'], cwd=APP_DIR, env=env,
+                                        pass_fds=(listen_fd, ready_write))
+        os.close(ready_write)
+        self.ready_fd = ready_read
+        self.pid = self.process.pid
+
+    def wait_ready(self, timeout):
+        """Block until the master reports its worker count and every worker has booted"""
+        deadline = time.monotonic() + timeout
+        received = b''
+        try:
+            while True:
+                header, newline, booted = received.partition(b'\n')
+                if newline and len(booted) >= int(header):
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self.process.poll() is not None:
+                    return False
+                readable, _, _ = select.select([self.ready_fd], [], [], min(remaining, 0.5))
+                if readable:
+                    chunk = os.read(self.ready_fd, 4096)
+                    if not chunk:
+                        return False
+                    received += chunk
+        finally:
+            os.close(self.ready_fd)
+
+    def stop(self):
+        """Ask the server to stop accepting and drain in-flight requests"""
+        if self.process.poll() is None:
+            self.process.send_signal(signal.SIGTERM)
+
+class Supervisor:
+    """Keep one generation of the server running and swap it on SIGHUP"""
+
+    def __init__(self, port, backlog, ready_timeout):
+        self.sock = listen(port, backlog)
+        self.ready_timeout = ready_timeout
+        self.current = None
+        self.draining = []
+        self.reload_requested = False
+        self.stop_requested = False
+
+    def start_generation(self):
+        """Start a new generation and make it current once it is ready"""
+        generation = Generation(self.sock.fileno())
+        log(f"started generation {generation.pid}, waiting for its workers")
+        if not generation.wait_ready(self.ready_timeout):
+            log(f"generation {generation.pid} did not become ready within {self.ready_timeout}s, stopping it")
+            generation.stop()
+            self.draining.append(generation)
+            return False
+
+        previous, self.current = self.current, generation
+        log(f"generation {generation.pid} is serving")
+        if previous is not None:
+            log(f"draining generation {previous.pid}")
+            previous.stop()
+            self.draining.append(previous)
+        return True
+
+    def reap(self):
+        for generation in list(self.draining):
+            if generation.process.poll() is not None:
+                log(f"generation {generation.pid} exited with {generation.process.returncode}")
+                self.draining.remove(generation)
+
+    def _request_reload(self, signum, frame):
+        self.reload_requested = True
+
+    def _request_stop(self, signum, frame):
+        self.stop_requested = True
+
+    def run(self):
+        signal.signal(signal.SIGHUP, self._request_reload)
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+
+        while not self.stop_requested:
+            if self.current is not None and self.current.process.poll() is not None:
+                log(f"generation {self.current.pid} exited with {self.current.process.returncode}, replacing it")
+                self.current = None
+            if self.current is None:
+                if not self.start_generation():
+                    # Back off before trying again
+                    time.sleep(1)
+            elif self.reload_requested:
+                self.reload_requested = False
+                log("reload requested")
+                self.start_generation()
+            self.reap()
+            time.sleep(0.2)
+
+        log("stopping")
+        for generation in [self.current] + self.draining:
+            if generation is not None:
+                generation.stop()
+        for generation in [self.current] + self.draining:
+            if generation is not None:
+                generation.process.wait()
+        return 0
+
+def main():
+    os.environ.setdefault('SERVER_MODE', 'threaded')
+    if os.environ['SERVER_MODE'] == 'dev':
+        raise ValueError("The supervisor needs a production SERVER_MODE, not 'dev'")
+    supervisor = Supervisor(int(os.getenv('PORT', 8082)), int(os.getenv('BACKLOG', 2048)),
+                            float(os.getenv('RELOAD_READY_TIMEOUT', 60)))
+    return supervisor.run()
+
+if __name__ == '__main__':
+    sys.exit(main())
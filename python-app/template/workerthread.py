@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""Background threads that each worker process starts for itself.
+
+Threads do not survive fork, so a thread started in the master (while
+preloading, say) is gone in the workers, while the object that owns it
+still says it is running. A WorkerThread starts its daemon thread on
+first use, and a single ``os.register_at_fork`` hook forgets the thread
+in every child, so each worker starts its own.
+"""
+
+import os
+import threading
+
+class WorkerThread:
+    """Owner of one lazily started daemon thread per process"""
+
+    thread_name = 'worker'
+
+    def __init__(self):
+        self._thread = None
+        self._start_lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._forget_thread)
+
+    def _forget_thread(self):
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._after_fork()
+
+    def _after_fork(self):
+        """Reset any other per-process state in a new child"""
+
+    def _prepare(self):
+        """Set up whatever the thread needs, just before it starts"""
+
+    def _run(self):
+        raise NotImplementedError
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        """Start the thread if it is not already running"""
+        with self._start_lock:
+            if self._thread is None:
+                self._prepare()
+                self._thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+                self._thread.start()